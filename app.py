@@ -1,8 +1,6 @@
 import streamlit as st
 import pandas as pd
-import io
-import re
-from collections import namedtuple
+import numpy as np
 
 # --- Import your page/tab functions ---
 # Make sure you have these files in the same directory
@@ -17,72 +15,64 @@ from university_exam_tab import university_exam_tab, extract_university_exam_dat
 from median_salary_tab import median_salary_tab, extract_median_salary_data
 from phd_data_tab import phd_data_tab, extract_phd_graduated_data
 from placement_data_tab import placement_data_tab, extract_placement_data
+from pdf_utils import ensure_preparsed, normalize_table, preparse_many
 
 # It's a best practice to have st.set_page_config as the first Streamlit command.
 st.set_page_config(page_title="NIRF PDF Extractor", layout="wide", initial_sidebar_state="expanded")
 
 
 # --- Logic for Program-wise Data (from your original app.py) ---
-ProgramLine = namedtuple('ProgramLine', [
-    'SNo', 'CollegeName', 'CollegeCode', 'ProgramName', 'SanctionedIntake', 'TotalStudents'
-])
-
-def extract_college_info(text):
-    college_name_match = re.search(r"Institute Name:\s*(.*?)\s*\[", text)
-    college_code_match = re.search(r"\[(IR-[^\]]+)\]", text)
-    college_name = college_name_match.group(1).strip() if college_name_match else "Not Found"
-    college_code = college_code_match.group(1).strip() if college_code_match else "Not Found"
-    return college_name, college_code
+_UG_PG = ("UG [", "PG [")
 
 def extract_program_data(pdf_file):
-    import pdfplumber
     sanctioned_intake = {}
     total_students = {}
     try:
-        with pdfplumber.open(pdf_file) as pdf:
-            first_page_text = pdf.pages[0].extract_text()
-            if not first_page_text: first_page_text = ""
-            college_name, college_code = extract_college_info(first_page_text)
-            for page in pdf.pages:
-                tables = page.extract_tables()
-                if not tables: continue
-                for table in tables:
-                    if not table or not table[0]: continue
-                    header = [str(cell).replace('\n', ' ') if cell else '' for cell in table[0]]
-                    if "Academic Year" in header[0] and "2022-23" in header:
-                        try:
-                            year_col_idx = header.index("2022-23")
-                            for row in table[1:]:
-                                program_name = str(row[0]).replace('\n', ' ').strip()
-                                if program_name and (program_name.startswith("UG [") or program_name.startswith("PG [")):
-                                    try:
-                                        intake_val = row[year_col_idx].strip()
-                                        if intake_val and intake_val not in ['-', '']:
-                                            sanctioned_intake[program_name] = int(intake_val.replace(',', ''))
-                                    except (ValueError, IndexError): continue
-                        except (ValueError): continue
-                    if "Total Students" in header and "No. of Male Students" in header:
+        preparsed = ensure_preparsed(pdf_file)
+        college_name, college_code = preparsed.college_name, preparsed.college_code
+        for tables in preparsed.pages_tables:
+            if not tables: continue
+            for table in tables:
+                if not table or not table[0]: continue
+                # Clean every cell once up front; the checks below work on plain strings
+                table = normalize_table(table)
+                header = table[0]
+                header_set = set(header)
+                # Each table is either the sanctioned intake table or the total students table
+                if "Academic Year" in header[0] and "2022-23" in header_set:
+                    target, value_col_idx = sanctioned_intake, header.index("2022-23")
+                elif "Total Students" in header_set and "No. of Male Students" in header_set:
+                    target, value_col_idx = total_students, header.index("Total Students")
+                else:
+                    continue
+                for row in table[1:]:
+                    program_name = row[0]
+                    if program_name.startswith(_UG_PG):
                         try:
-                            program_col_idx = 0
-                            total_students_col_idx = header.index("Total Students")
-                            for row in table[1:]:
-                                program_name = str(row[program_col_idx]).replace('\n', ' ').strip()
-                                if program_name and (program_name.startswith("UG [") or program_name.startswith("PG [")):
-                                    try:
-                                        total_val = row[total_students_col_idx].strip()
-                                        if total_val: total_students[program_name] = int(total_val.replace(',', ''))
-                                    except (ValueError, IndexError): continue
-                        except (ValueError): continue
-            lines = []
-            all_programs = sorted(list(set(sanctioned_intake.keys()) | set(total_students.keys())))
-            s_no = 1
-            for prog in all_programs:
-                intake = sanctioned_intake.get(prog, 0)
-                students = total_students.get(prog, 0)
-                if intake > 0 or students > 0:
-                    lines.append(ProgramLine(s_no, college_name, college_code, prog, intake, students))
-                    s_no += 1
-            return pd.DataFrame(lines)
+                            value = row[value_col_idx]
+                            if value and value != '-':
+                                target[program_name] = int(value.replace(',', ''))
+                        except (ValueError, IndexError): continue
+        programs, intakes, students = [], [], []
+        for prog in sorted(sanctioned_intake.keys() | total_students.keys()):
+            intake = sanctioned_intake.get(prog, 0)
+            student_count = total_students.get(prog, 0)
+            if intake > 0 or student_count > 0:
+                programs.append(prog)
+                intakes.append(intake)
+                students.append(student_count)
+        if not programs:
+            return pd.DataFrame()
+        # Build the table column by column rather than from one record per program
+        n_programs = len(programs)
+        return pd.DataFrame({
+            'SNo': range(1, n_programs + 1),
+            'CollegeName': [college_name] * n_programs,
+            'CollegeCode': [college_code] * n_programs,
+            'ProgramName': programs,
+            'SanctionedIntake': np.asarray(intakes, dtype=np.int64),
+            'TotalStudents': np.asarray(students, dtype=np.int64),
+        })
     except Exception as e:
         st.error(f"An error occurred while processing program data: {e}")
         return pd.DataFrame()
@@ -93,9 +83,8 @@ def program_wise_data_tab():
     if uploaded_files:
         all_dfs = []
         with st.spinner("Extracting program data..."):
-            for pdf in uploaded_files:
-                pdf.seek(0)
-                df = extract_program_data(pdf)
+            for preparsed in preparse_many(uploaded_files):
+                df = extract_program_data(preparsed)
                 if not df.empty: all_dfs.append(df)
         if all_dfs:
             combined_df = pd.concat(all_dfs, ignore_index=True)
@@ -1,11 +1,14 @@
 import streamlit as st
-import pandas as pd
 import io
-import requests
 import re # <-- FIX: Added the missing import statement
 
 # Assuming url_utils.py exists for this function
-from url_utils import extract_pdf_links_from_url
+from url_utils import download_pdf, extract_pdf_links_from_url
+from pdf_utils import extract_college_info, get_first_page_text_fast, preparse, read_pdf_bytes
+from excel_utils import dataframes_to_excel_bytes
+from median_salary_tab import style_salaries
+
+_INVALID_SHEET_CHARS_RE = re.compile(r'[\\/*?:"<>|]')
 
 def college_specific_tab(master_extractors_list):
     """
@@ -40,40 +43,45 @@ def college_specific_tab(master_extractors_list):
         pdf_file_to_process = uploaded_file
     elif url_input:
         if url_input.lower().endswith('.pdf'):
+            import requests
             try:
                 with st.spinner(f"Downloading PDF from {url_input}..."):
-                    response = requests.get(url_input, timeout=15)
-                    response.raise_for_status()
                     # Create an in-memory file-like object
-                    pdf_file_to_process = io.BytesIO(response.content)
+                    pdf_file_to_process = io.BytesIO(download_pdf(url_input))
             except requests.exceptions.RequestException as e:
                 st.error(f"Failed to download PDF: {e}")
         else:
             st.warning("Please provide a direct URL ending in .pdf")
 
     if pdf_file_to_process:
-        # --- Run all extractions ---
-        all_results = {}
-        college_name = "Unknown College"
-        college_code = "Unknown Code"
-        
-        # Get college info first from the program_data extractor
-        program_data_func = next((func for name, func in master_extractors_list if name == "Program-wise Data"), None)
-        if program_data_func:
-            pdf_file_to_process.seek(0)
-            temp_df = program_data_func(pdf_file_to_process)
-            if not temp_df.empty:
-                college_name = temp_df['CollegeName'].iloc[0]
-                college_code = temp_df['CollegeCode'].iloc[0]
+        pdf_bytes = read_pdf_bytes(pdf_file_to_process)
+
+        # --- Show the college header straight away using the fast text-only path ---
+        try:
+            college_name, college_code = extract_college_info(get_first_page_text_fast(pdf_bytes))
+        except Exception as e:
+            st.error(f"Failed to open PDF: {e}")
+            return
+        if college_name == "Not Found": college_name = "Unknown College"
+        if college_code == "Not Found": college_code = "Unknown Code"
 
         st.header(f"📊 Extracted Data for: {college_name}")
         st.subheader(f"College Code: {college_code}")
 
+        # --- Parse the PDF once and share it with every extractor ---
+        try:
+            with st.spinner("Parsing PDF..."):
+                preparsed = preparse(pdf_bytes)
+        except Exception as e:
+            st.error(f"Failed to parse PDF: {e}")
+            return
+
+        all_results = {}
+
         with st.spinner("Running all data extractors..."):
             for name, func in master_extractors_list:
                 try:
-                    pdf_file_to_process.seek(0)
-                    df = func(pdf_file_to_process)
+                    df = func(preparsed)
                     if not df.empty:
                         all_results[name] = df
                 except Exception as e:
@@ -82,18 +90,16 @@ def college_specific_tab(master_extractors_list):
         # --- Display all results ---
         for name, df in all_results.items():
             st.subheader(f"📋 {name}")
-            st.dataframe(df, use_container_width=True)
+            # Salaries are formatted on screen only; the Excel download keeps the raw numbers
+            st.dataframe(style_salaries(df), use_container_width=True)
 
         # --- Consolidated Excel Download Button ---
         if all_results:
-            output = io.BytesIO()
-            with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                for sheet_name, df in all_results.items():
-                    # Sanitize sheet name for Excel (max 31 chars, no invalid chars)
-                    safe_sheet_name = re.sub(r'[\\/*?:"<>|]', "", sheet_name)[:31]
-                    df.to_excel(writer, index=False, sheet_name=safe_sheet_name)
-            
-            processed_data = output.getvalue()
+            # Sanitize sheet names for Excel (max 31 chars, no invalid chars)
+            processed_data = dataframes_to_excel_bytes({
+                _INVALID_SHEET_CHARS_RE.sub("", sheet_name)[:31]: df
+                for sheet_name, df in all_results.items()
+            })
 
             st.download_button(
                 label="📥 Download Complete Report as Excel",
@@ -0,0 +1,31 @@
+import io
+
+import xlsxwriter
+
+# Same header look as pandas' to_excel output
+_HEADER_FORMAT = {'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'}
+
+
+def dataframes_to_excel_bytes(sheets):
+    """
+    Writes each DataFrame in the {sheet_name: df} mapping to its own sheet and returns the
+    workbook as bytes.
+
+    Rows are streamed straight to xlsxwriter in 'constant_memory' mode, which flushes each row
+    as soon as the next one starts instead of keeping the whole workbook in RAM. pandas' own
+    to_excel can't be used with that mode because it writes cells column by column.
+    """
+    output = io.BytesIO()
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+    header_format = workbook.add_format(_HEADER_FORMAT)
+
+    for sheet_name, df in sheets.items():
+        worksheet = workbook.add_worksheet(sheet_name)
+        worksheet.write_row(0, 0, [str(col) for col in df.columns], header_format)
+        # Blank out missing values like to_excel does; xlsxwriter rejects NaN.
+        values = df.astype(object).where(df.notna(), None)
+        for row_idx, row in enumerate(values.itertuples(index=False, name=None), start=1):
+            worksheet.write_row(row_idx, 0, row)
+
+    workbook.close()
+    return output.getvalue()
@@ -1,26 +1,41 @@
 import streamlit as st
-import pdfplumber
 import pandas as pd
 import io
 import re
-import numpy as np
+
+from pdf_utils import ensure_preparsed, normalize_table, preparse_many
+
+_YEAR_RE = re.compile(r'\d{4}-\d{2}')
+_NAME_RE = re.compile(r'Institute Name:\s*(.*?)\s*\[')
+_ID_RE = re.compile(r'\[(IR-[A-Z]-[A-Z]-\d+)\]')
+_LAKH_GROUPS_RE = re.compile(r'(\d)(?=(\d{2})+$)')
+
+# Keywords to identify rows within the tables, matched case-insensitively in a single regex pass
+_CAPITAL_KEYS = ["Library", "New Equipment", "Engineering Workshops", "creation of Capital Assets"]
+_OPERATIONAL_KEYS = ["Salaries", "Maintenance of Academic Infrastructure", "Seminars"]
+_CAPITAL_KEYS_RE = re.compile('|'.join(re.escape(key) for key in _CAPITAL_KEYS), re.IGNORECASE)
+_OPERATIONAL_KEYS_RE = re.compile('|'.join(re.escape(key) for key in _OPERATIONAL_KEYS), re.IGNORECASE)
+
+
+class _KeepDigitsTable(dict):
+    """
+    str.translate() table that keeps ASCII digits and deletes every other character.
+    Each code point is resolved once and then served from the dict at C speed.
+    """
+    def __missing__(self, codepoint):
+        value = codepoint if 48 <= codepoint <= 57 else None
+        self[codepoint] = value
+        return value
+
+_KEEP_DIGITS = _KeepDigitsTable()
 
 def format_indian_currency(number):
     """Formats a number into Indian currency style (₹ ##,##,##,###)."""
     s = str(int(number))
     if len(s) <= 3:
         return '₹ ' + s
-    else:
-        last3 = s[-3:]
-        rest = s[:-3]
-        parts = []
-        while len(rest) > 2:
-            parts.append(rest[-2:])
-            rest = rest[:-2]
-        if rest:
-            parts.append(rest)
-        formatted = ','.join(reversed(parts)) + ',' + last3
-        return '₹ ' + formatted
+    # Last three digits form the thousands group; the rest is grouped in pairs (lakhs, crores).
+    return '₹ ' + _LAKH_GROUPS_RE.sub(r'\1,', s[:-3]) + ',' + s[-3:]
 
 def extract_expenditure_data(pdf_file):
     """
@@ -29,120 +44,116 @@ def extract_expenditure_data(pdf_file):
     This version is more robust and identifies tables by their content.
     """
     try:
-        with pdfplumber.open(pdf_file) as pdf:
-            # Get College Info from the first page
-            first_page_text = pdf.pages[0].extract_text()
-            if not first_page_text: first_page_text = ""
-            name_match = re.search(r'Institute Name:\s*(.*?)\s*\[', first_page_text)
-            id_match = re.search(r'\[(IR-[A-Z]-[A-Z]-\d+)\]', first_page_text)
-            college_name = name_match.group(1).strip() if name_match else "Unknown"
-            college_id = id_match.group(1).strip() if id_match else "Unknown"
-
-            capital_exp = {}
-            operational_exp = {}
+        preparsed = ensure_preparsed(pdf_file)
+        # Get College Info from the first page
+        first_page_text = preparsed.pages_text[0]
+        if not first_page_text: first_page_text = ""
+        name_match = _NAME_RE.search(first_page_text)
+        id_match = _ID_RE.search(first_page_text)
+        college_name = name_match.group(1).strip() if name_match else "Unknown"
+        college_id = id_match.group(1).strip() if id_match else "Unknown"
+
+        capital_exp = {}
+        operational_exp = {}
+
+        # NIRF reports put both expenditure tables right after the "Financial Resources" heading,
+        # so start scanning from that page (or from the first page if the heading is missing).
+        start_page = next((i for i, text in enumerate(preparsed.pages_text) if "Financial Resources: Utilised Amount" in text), 0)
+        last_match_page = start_page
+
+        # Find and process both expenditure tables
+        for page_idx, tables in enumerate(preparsed.pages_tables[start_page:], start_page):
+            # Stop once both tables have been found and the scan has moved past their last page
+            if capital_exp and operational_exp and page_idx > last_match_page:
+                break
+            if not tables:
+                continue
             
-            # Keywords to identify rows within the tables
-            capital_keys = ["Library", "New Equipment", "Engineering Workshops", "creation of Capital Assets"]
-            operational_keys = ["Salaries", "Maintenance of Academic Infrastructure", "Seminars"]
-
-            # Find and process both expenditure tables
-            for page in pdf.pages:
-                tables = page.extract_tables()
-                if not tables:
+            for table in tables:
+                if not table or len(table) < 2:
                     continue
+                # Clean every cell once up front; the checks below work on plain strings
+                table = normalize_table(table)
+
+                # Check the content of the first column to identify the table type
+                first_col_text = " ".join([row[0] for row in table if row and row[0]])
                 
-                for table in tables:
-                    if not table or len(table) < 2:
-                        continue
-                    
-                    # Check the content of the first column to identify the table type
-                    first_col_text = " ".join([str(row[0]) for row in table if row and row[0]])
-                    
-                    is_capital_table = "Capital Expenditure" in first_col_text
-                    is_operational_table = "Operational Expenditure" in first_col_text
+                is_capital_table = "Capital Expenditure" in first_col_text
+                is_operational_table = "Operational Expenditure" in first_col_text
 
-                    if not (is_capital_table or is_operational_table):
-                        continue
+                if not (is_capital_table or is_operational_table):
+                    continue
+                last_match_page = page_idx
+
+                if is_capital_table:
+                    target_dict = capital_exp
+                    keys_re = _CAPITAL_KEYS_RE
+                else:
+                    target_dict = operational_exp
+                    keys_re = _OPERATIONAL_KEYS_RE
+
+                # The header with years is the first row containing year-like strings
+                header = []
+                for row in table:
+                    if any(_YEAR_RE.match(cell) for cell in row):
+                        header = row
+                        break
+                
+                if not header:
+                    continue
 
-                    # The header with years is the first row containing year-like strings
-                    header = []
-                    for row in table:
-                        if any(re.match(r'\d{4}-\d{2}', str(cell)) for cell in row):
-                            header = [str(cell).replace('\n', ' ') if cell else '' for cell in row]
-                            break
-                    
-                    if not header:
-                        continue
+                years = [h for h in header if _YEAR_RE.match(h)]
+                if not years:
+                    continue
+                year_to_idx = {year: header.index(year) for year in years}
 
-                    years = [h for h in header if re.match(r'\d{4}-\d{2}', h)]
-                    if not years:
+                # Now process the rows of the identified table
+                for row in table:
+                    if not row or not row[0]:
                         continue
-
-                    # Now process the rows of the identified table
-                    for row in table:
-                        if not row or not row[0]:
-                            continue
-                        
-                        row_title = str(row[0]).replace('\n', ' ')
-                        
-                        target_dict = None
-                        keys_to_check = []
-                        if is_capital_table:
-                            target_dict = capital_exp
-                            keys_to_check = capital_keys
-                        elif is_operational_table:
-                            target_dict = operational_exp
-                            keys_to_check = operational_keys
-
-                        # Check if the row title matches any of our keywords
-                        if any(key.lower() in row_title.lower() for key in keys_to_check):
-                            for year in years:
-                                try:
-                                    year_col_idx = header.index(year)
-                                    if year_col_idx >= len(row) or not row[year_col_idx]: continue
-
-                                    val_str = str(row[year_col_idx]).split('(')[0].strip()
-                                    value = int(re.sub(r'[^0-9]', '', val_str))
-                                    target_dict[year] = target_dict.get(year, 0) + value
-                                except (ValueError, IndexError):
-                                    continue
-            
-            # --- Combine and structure the data ---
-            all_years = sorted(list(set(capital_exp.keys()) | set(operational_exp.keys())), reverse=True)
-            
-            if not all_years:
-                return pd.DataFrame()
-
-            rows = []
-            for idx, year in enumerate(all_years, 1):
-                cap = capital_exp.get(year, 0)
-                op = operational_exp.get(year, 0)
-                rows.append({
-                    "S.No": idx,
-                    "College Name": college_name,
-                    "College ID": college_id,
-                    "Academic Year": year,
-                    "Capital Expenditure": format_indian_currency(cap),
-                    "Operational Expenditure": format_indian_currency(op),
-                    "Total Expenditure": format_indian_currency(cap + op)
-                })
-
-            # --- Calculate and add the Average row ---
-            avg_cap = np.mean(list(capital_exp.values())) if capital_exp else 0
-            avg_op = np.mean(list(operational_exp.values())) if operational_exp else 0
-            avg_total = avg_cap + avg_op
-
-            rows.append({
-                "S.No": "",
-                "College Name": "",
-                "College ID": "",
-                "Academic Year": "**Average**",
-                "Capital Expenditure": format_indian_currency(avg_cap),
-                "Operational Expenditure": format_indian_currency(avg_op),
-                "Total Expenditure": format_indian_currency(avg_total)
-            })
-
-            return pd.DataFrame(rows)
+                    
+                    # Check if the row title matches any of our keywords
+                    if keys_re.search(row[0]):
+                        for year in years:
+                            try:
+                                year_col_idx = year_to_idx[year]
+                                if year_col_idx >= len(row) or not row[year_col_idx]: continue
+
+                                digits = row[year_col_idx].split('(')[0].translate(_KEEP_DIGITS)
+                                if not digits: continue
+                                value = int(digits)
+                                target_dict[year] = target_dict.get(year, 0) + value
+                            except (ValueError, IndexError):
+                                continue
+        
+        # --- Combine and structure the data ---
+        all_years = sorted(list(set(capital_exp.keys()) | set(operational_exp.keys())), reverse=True)
+        
+        if not all_years:
+            return pd.DataFrame()
+
+        cap_values = [capital_exp.get(year, 0) for year in all_years]
+        op_values = [operational_exp.get(year, 0) for year in all_years]
+        total_values = [cap + op for cap, op in zip(cap_values, op_values)]
+
+        # --- Calculate the Average row ---
+        avg_cap = sum(capital_exp.values()) / len(capital_exp) if capital_exp else 0
+        avg_op = sum(operational_exp.values()) / len(operational_exp) if operational_exp else 0
+        avg_total = avg_cap + avg_op
+
+        # --- Build the table column by column, with the Average row last ---
+        # Amounts are formatted on the plain lists before the DataFrame exists, rather than
+        # through a per-element Series.map afterwards.
+        n_years = len(all_years)
+        return pd.DataFrame({
+            "S.No": list(range(1, n_years + 1)) + [""],
+            "College Name": [college_name] * n_years + [""],
+            "College ID": [college_id] * n_years + [""],
+            "Academic Year": all_years + ["**Average**"],
+            "Capital Expenditure": [format_indian_currency(v) for v in cap_values + [avg_cap]],
+            "Operational Expenditure": [format_indian_currency(v) for v in op_values + [avg_op]],
+            "Total Expenditure": [format_indian_currency(v) for v in total_values + [avg_total]]
+        })
 
     except Exception as e:
         st.error(f"An error occurred in expenditure extraction: {e}")
@@ -156,8 +167,8 @@ def expenditure_tab():
     if uploaded_pdfs:
         all_dfs = []
         with st.spinner("Extracting expenditure data from all files..."):
-            for pdf in uploaded_pdfs:
-                df = extract_expenditure_data(pdf)
+            for preparsed in preparse_many(uploaded_pdfs):
+                df = extract_expenditure_data(preparsed)
                 if not df.empty:
                     all_dfs.append(df)
 
@@ -175,8 +186,8 @@ def expenditure_tab():
             numeric_df = combined_df[combined_df["Academic Year"] != "**Average**"].copy()
             for col in ["Capital Expenditure", "Operational Expenditure", "Total Expenditure"]:
                 if col in numeric_df.columns:
-                    # CORRECTED LINE: This regex now removes all non-digit characters.
-                    numeric_df[col] = numeric_df[col].replace('[^0-9]', '', regex=True).astype(float)
+                    # Strip the currency symbol and separators, keeping only the digits.
+                    numeric_df[col] = numeric_df[col].str.translate(_KEEP_DIGITS).astype('int64')
 
             towrite = io.BytesIO()
             with pd.ExcelWriter(towrite, engine='xlsxwriter') as writer:
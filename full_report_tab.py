@@ -1,11 +1,15 @@
 import streamlit as st
 import pandas as pd
 import io
-import requests
 import re
 
 # Assuming url_utils.py exists and is correct
-from url_utils import extract_pdf_links_from_url
+from url_utils import download_pdfs, extract_pdf_links_from_url
+from pdf_utils import preparse
+from excel_utils import dataframes_to_excel_bytes
+from median_salary_tab import SALARY_DISPLAY_FORMAT
+
+_INVALID_SHEET_CHARS_RE = re.compile(r'[\\/*?:"<>|]')
 
 def reformat_data_for_full_report(df, extractor_name):
     """
@@ -18,31 +22,46 @@ def reformat_data_for_full_report(df, extractor_name):
     # Standard columns to ignore when creating parameter names
     ignore_cols = ['SNo', 'S.No', 'CollegeName', 'CollegeCode', 'ProgramName', 'Program', 'Academic Year', 'Financial Year', 'GraduationYear']
 
+    # Columns that add context (e.g. Program Name or Year) to make parameters unique, with their label format
+    context_formats = [
+        ('ProgramName', " ({})"),
+        ('Program', " ({})"),
+        ('Academic Year', " ({})"),
+        ('Financial Year', " ({})"),
+        ('GraduationYear', " (Graduating {})"),
+    ]
+
     if df.empty:
         return pd.DataFrame()
 
+    # Resolve column positions once instead of looking columns up in every row
+    columns = list(df.columns)
+    context_positions = [(columns.index(col), fmt) for col, fmt in context_formats if col in columns]
+    value_columns = [(pos, col) for pos, col in enumerate(columns) if col not in ignore_cols]
+
     # Iterate through each row of the input dataframe to create parameter-value pairs
-    for _, row in df.iterrows():
-        # Create a context string (e.g., from Program Name or Year) to make parameters unique
-        context = ""
-        if 'ProgramName' in row and pd.notna(row['ProgramName']):
-            context += f" ({row['ProgramName']})"
-        if 'Program' in row and pd.notna(row['Program']):
-            context += f" ({row['Program']})"
-        if 'Academic Year' in row and pd.notna(row['Academic Year']):
-            context += f" ({row['Academic Year']})"
-        if 'Financial Year' in row and pd.notna(row['Financial Year']):
-            context += f" ({row['Financial Year']})"
-        if 'GraduationYear' in row and pd.notna(row['GraduationYear']):
-            context += f" (Graduating {row['GraduationYear']})"
-
-        # Create a key-value pair for each relevant column in the row
-        for col_name, value in row.items():
-            if col_name not in ignore_cols:
-                parameter_name = f"{col_name}{context}".strip()
-                report_rows.append({'Parameter': parameter_name, 'Value': value})
-
-    return pd.DataFrame(report_rows)
+    for row in df.itertuples(index=False, name=None):
+        context = "".join(fmt.format(row[pos]) for pos, fmt in context_positions if pd.notna(row[pos]))
+
+        # Create a parameter-value pair for each relevant column in the row
+        for pos, col_name in value_columns:
+            report_rows.append((f"{col_name}{context}".strip(), row[pos]))
+
+    return pd.DataFrame(report_rows, columns=['Parameter', 'Value'])
+
+
+def style_report(report_df):
+    """
+    Formats the median salary rows of a report as rupee amounts for display. The report
+    itself (and the Excel download) keeps the raw numbers.
+    """
+    styler = report_df.style
+    for col, fmt in SALARY_DISPLAY_FORMAT.items():
+        # Salary parameters are the column name, optionally followed by " (<program>) (<year>)"
+        is_salary = (report_df['Parameter'] == col) | report_df['Parameter'].str.startswith(f"{col} (")
+        if is_salary.any():
+            styler = styler.format(fmt, subset=pd.IndexSlice[is_salary, 'Value'], na_rep="")
+    return styler
 
 
 def full_report_tab(master_extractors_list):
@@ -74,9 +93,8 @@ def full_report_tab(master_extractors_list):
                 try:
                     pdf_links = extract_pdf_links_from_url(url_input)
                     st.success(f"Found {len(pdf_links)} PDF links. Downloading and processing...")
-                    for link in pdf_links:
-                        response = requests.get(link, timeout=15)
-                        pdf_files_to_process.append(io.BytesIO(response.content))
+                    for content in download_pdfs(pdf_links):
+                        pdf_files_to_process.append(io.BytesIO(content))
                 except Exception as e:
                     st.error(f"Failed to process URL: {e}")
         
@@ -94,11 +112,17 @@ def full_report_tab(master_extractors_list):
         for i, pdf_file in enumerate(pdf_files_to_process):
             report_data = []
             college_name, college_code = "Unknown College", f"PDF_{i+1}"
+
+            # Parse the PDF once; every extractor reads from the same pre-parsed pages.
+            try:
+                preparsed = preparse(pdf_file)
+            except Exception as e:
+                st.error(f"Failed to parse PDF {i+1}: {e}")
+                continue
             
             for name, func in master_extractors_list:
                 try:
-                    pdf_file.seek(0)
-                    df = func(pdf_file)
+                    df = func(preparsed)
                     if not df.empty:
                         if college_name == "Unknown College" and 'CollegeName' in df.columns:
                             college_name = df['CollegeName'].iloc[0]
@@ -128,17 +152,14 @@ def full_report_tab(master_extractors_list):
             
             for i, tab_name in enumerate(tab_names):
                 with tabs[i]:
-                    st.dataframe(all_college_reports[tab_name], use_container_width=True, hide_index=True)
+                    st.dataframe(style_report(all_college_reports[tab_name]), use_container_width=True, hide_index=True)
             
             # --- Consolidated Multi-Sheet Excel Download ---
-            output = io.BytesIO()
-            with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                for sheet_name, report_df in all_college_reports.items():
-                    # Sanitize sheet name for Excel
-                    safe_sheet_name = re.sub(r'[\\/*?:"<>|]', "", sheet_name)[:31]
-                    report_df.to_excel(writer, index=False, sheet_name=safe_sheet_name)
-            
-            processed_data = output.getvalue()
+            # Sanitize sheet names for Excel
+            processed_data = dataframes_to_excel_bytes({
+                _INVALID_SHEET_CHARS_RE.sub("", sheet_name)[:31]: report_df
+                for sheet_name, report_df in all_college_reports.items()
+            })
 
             st.download_button(
                 label="📥 Download All Reports as Excel (One Sheet per College)",
@@ -1,10 +1,12 @@
 import streamlit as st
 import pandas as pd
 import io
-import requests
 
 # This utility needs to be in a file named url_utils.py
-from url_utils import extract_pdf_links_from_url
+from url_utils import download_pdfs, extract_pdf_links_from_url
+from pdf_utils import preparse_as_completed
+from excel_utils import dataframes_to_excel_bytes
+from median_salary_tab import style_salaries
 
 def run_all_extractions(pdf_files, extractors_list):
     """
@@ -20,24 +22,29 @@ def run_all_extractions(pdf_files, extractors_list):
     all_results = {name: [] for name, _ in extractors_list}
 
     # Progress bar for better user feedback
-    progress_bar = st.progress(0, text="Starting...")
-    total_steps = len(pdf_files) * len(extractors_list)
-    current_step = 0
+    progress_bar = st.progress(0, text="Parsing PDFs...")
+    results_by_pdf = [None] * len(pdf_files)
+    # Each progress update is a round-trip to the browser, so send at most ~20 of them
+    update_every = max(1, len(pdf_files) // 20)
 
-    for i, pdf_file in enumerate(pdf_files):
+    # PDFs are parsed in parallel worker processes; each one is run through every extractor
+    # as soon as it is ready, while the rest are still parsing.
+    for done, (i, preparsed) in enumerate(preparse_as_completed(pdf_files), start=1):
+        results_by_pdf[i] = []
         for name, func in extractors_list:
-            progress_text = f"Processing PDF {i+1}/{len(pdf_files)} - Running '{name}'..."
-            progress_bar.progress(current_step / total_steps, text=progress_text)
             try:
-                # Reset file buffer for each function
-                pdf_file.seek(0)
-                df = func(pdf_file)
+                df = func(preparsed)
                 if not df.empty:
-                    all_results[name].append(df)
+                    results_by_pdf[i].append((name, df))
             except Exception as e:
                 st.error(f"Error running '{name}' on PDF {i+1}: {e}")
-            
-            current_step += 1
+        if done % update_every == 0 or done == len(pdf_files):
+            progress_bar.progress(done / len(pdf_files), text=f"Extracted PDF {i+1} ({done}/{len(pdf_files)} done)...")
+
+    # Keep the results in upload order, whatever order the PDFs finished in
+    for pdf_results in results_by_pdf:
+        for name, df in pdf_results:
+            all_results[name].append(df)
 
     progress_bar.empty()
 
@@ -48,12 +55,10 @@ def run_all_extractions(pdf_files, extractors_list):
         if dfs:
             with st.expander(f"📊 Results: {name}", expanded=True):
                 final_df = pd.concat(dfs, ignore_index=True)
-                st.dataframe(final_df, use_container_width=True)
+                # Salaries are formatted on screen only; the Excel download keeps the raw numbers
+                st.dataframe(style_salaries(final_df), use_container_width=True)
 
-                output = io.BytesIO()
-                with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                    final_df.to_excel(writer, index=False, sheet_name=name)
-                processed_data = output.getvalue()
+                processed_data = dataframes_to_excel_bytes({name: final_df})
 
                 st.download_button(
                     label=f"📥 Download {name} as Excel",
@@ -102,13 +107,16 @@ def homepage(master_extractors_list):
                 pdf_links = extract_pdf_links_from_url(url_input)
                 if pdf_links:
                     st.success(f"Found {len(pdf_links)} PDF links.")
-                    for link in pdf_links:
-                        try:
-                            response = requests.get(link, timeout=15)
-                            response.raise_for_status()
-                            pdf_files_to_process.append(io.BytesIO(response.content))
-                        except requests.exceptions.RequestException as e:
-                            st.error(f"Failed to download PDF from {link}: {e}")
+                    # Download all links concurrently; failures are reported once every download is done
+                    download_errors = []
+                    downloads = download_pdfs(pdf_links, raise_for_status=True, return_exceptions=True)
+                    for link, content in zip(pdf_links, downloads):
+                        if isinstance(content, Exception):
+                            download_errors.append((link, content))
+                        else:
+                            pdf_files_to_process.append(io.BytesIO(content))
+                    for link, e in download_errors:
+                        st.error(f"Failed to download PDF from {link}: {e}")
                 elif url_input and not pdf_links:
                     st.warning("No PDF links were found at the provided URL.")
         
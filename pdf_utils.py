@@ -0,0 +1,301 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+
+_INSTITUTE_RE = re.compile(r"Institute Name:\s*(.*?)\s*\[")
+_CODE_RE = re.compile(r"\[(IR-[^\]]+)\]")
+
+# Parsed PDFs keyed by the SHA-256 of their bytes, so the same upload processed by several
+# tabs (or on every Streamlit rerun) is parsed only once. Bounded to keep memory in check.
+_CACHE_MAX_ENTRIES = 64
+
+# A single long PDF has its pages split across worker processes. Below this many pages per
+# worker, starting the workers costs more than the split saves.
+_MIN_PAGES_PER_WORKER = 10
+_preparsed_cache = OrderedDict()
+_preparsed_cache_lock = threading.Lock()
+
+
+@dataclass
+class PreparsedPDF:
+    """
+    Everything the extractors need from a NIRF PDF, parsed in a single pdfplumber pass.
+
+    Each extractor used to open and re-parse the same PDF on its own; building this
+    once and handing it to every extractor avoids the repeated layout analysis.
+    """
+    pages_text: list          # page.extract_text() for each page
+    pages_tables: list        # page.extract_tables() for each page
+    pages_table_bboxes: list  # bbox of every table in pages_tables
+    pages_lines: list         # (top, text) of every text line on each page
+    college_name: str
+    college_code: str
+
+
+def extract_college_info(text):
+    """Extracts college name and ID from text."""
+    # Cheap substring checks skip the regex scans on pages without the markers
+    college_name_match = _INSTITUTE_RE.search(text) if "Institute Name:" in text else None
+    college_code_match = _CODE_RE.search(text) if "[IR-" in text else None
+    college_name = college_name_match.group(1).strip() if college_name_match else "Not Found"
+    college_code = college_code_match.group(1).strip() if college_code_match else "Not Found"
+    return college_name, college_code
+
+
+def preparse(pdf_file):
+    """
+    Returns the PreparsedPDF for pdf_file, parsing it only if the same bytes have not been
+    parsed before in this server process.
+    """
+    pdf_bytes = read_pdf_bytes(pdf_file)
+    key = _content_key(pdf_bytes)
+    preparsed = _cache_get(key)
+    if preparsed is None:
+        preparsed = _parse_split(pdf_bytes)
+        _cache_put(key, preparsed)
+    return preparsed
+
+
+def _content_key(pdf_bytes):
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+def _cache_get(key):
+    with _preparsed_cache_lock:
+        preparsed = _preparsed_cache.get(key)
+        if preparsed is not None:
+            _preparsed_cache.move_to_end(key)
+        return preparsed
+
+
+def _cache_put(key, preparsed):
+    with _preparsed_cache_lock:
+        _preparsed_cache[key] = preparsed
+        _preparsed_cache.move_to_end(key)
+        while len(_preparsed_cache) > _CACHE_MAX_ENTRIES:
+            _preparsed_cache.popitem(last=False)
+
+
+def _parse(pdf_bytes):
+    """Opens the PDF once and extracts the text lines and tables of every page."""
+    return _build_preparsed(*_parse_pages(pdf_bytes))
+
+
+def _parse_split(pdf_bytes):
+    """
+    Same as _parse, but a long PDF has its pages split into contiguous ranges that are parsed
+    in parallel worker processes, each opening its own copy of the document. Used when a single
+    PDF is parsed on its own; batches are already parallel across PDFs.
+    """
+    try:
+        import pymupdf
+
+        # PyMuPDF counts pages without pdfplumber's per-page setup
+        with pymupdf.open(stream=pdf_bytes, filetype="pdf") as doc:
+            page_count = doc.page_count
+    except Exception:
+        return _parse(pdf_bytes)
+
+    workers = min(os.cpu_count() or 1, page_count // _MIN_PAGES_PER_WORKER)
+    if workers < 2:
+        return _parse(pdf_bytes)
+
+    chunk_size = -(-page_count // workers)  # ceiling division
+    page_ranges = [
+        list(range(first, min(first + chunk_size, page_count + 1)))
+        for first in range(1, page_count + 1, chunk_size)
+    ]
+    # 'spawn' avoids forking the Streamlit server process with its threads and sockets.
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        parts = list(executor.map(_parse_pages, [pdf_bytes] * len(page_ranges), page_ranges))
+
+    pages_text, pages_tables, pages_table_bboxes, pages_lines = [], [], [], []
+    for part_text, part_tables, part_bboxes, part_lines in parts:
+        pages_text.extend(part_text)
+        pages_tables.extend(part_tables)
+        pages_table_bboxes.extend(part_bboxes)
+        pages_lines.extend(part_lines)
+    return _build_preparsed(pages_text, pages_tables, pages_table_bboxes, pages_lines)
+
+
+def _build_preparsed(pages_text, pages_tables, pages_table_bboxes, pages_lines):
+    college_name, college_code = extract_college_info(pages_text[0] if pages_text else "")
+    return PreparsedPDF(pages_text, pages_tables, pages_table_bboxes, pages_lines, college_name, college_code)
+
+
+def _parse_pages(pdf_bytes, page_numbers=None):
+    """
+    Extracts the text lines and tables of the given 1-based page numbers (all pages if None).
+    Returns (pages_text, pages_tables, pages_table_bboxes, pages_lines).
+    """
+    # Imported here so the app starts without loading pdfminer until the first PDF arrives.
+    import pdfplumber
+
+    pdf_file = io.BytesIO(pdf_bytes)
+    pages_text, pages_tables, pages_table_bboxes, pages_lines = [], [], [], []
+    with pdfplumber.open(pdf_file, pages=page_numbers) as pdf:
+        for page in pdf.pages:
+            # extract_text_lines() runs the same layout pass as extract_text(), but also
+            # keeps each line's position so the text above a table can be looked up later.
+            lines = [(line['top'], line['text']) for line in page.extract_text_lines()]
+            table_objects = page.find_tables()
+            pages_lines.append(lines)
+            pages_text.append("\n".join(text for _, text in lines))
+            pages_tables.append([table_obj.extract() for table_obj in table_objects])
+            pages_table_bboxes.append([table_obj.bbox for table_obj in table_objects])
+
+    return pages_text, pages_tables, pages_table_bboxes, pages_lines
+
+
+def get_first_page_text_fast(pdf_bytes):
+    """
+    Returns the text of the first page using PyMuPDF, which is much faster than pdfplumber
+    when only text is needed. Table extraction stays on pdfplumber.
+    """
+    import pymupdf
+
+    with pymupdf.open(stream=pdf_bytes, filetype="pdf") as doc:
+        return doc[0].get_text() if doc.page_count else ""
+
+
+def ensure_preparsed(pdf_file):
+    """Returns pdf_file unchanged if it is already a PreparsedPDF, otherwise parses it."""
+    if isinstance(pdf_file, PreparsedPDF):
+        return pdf_file
+    return preparse(pdf_file)
+
+
+def normalize_table(table):
+    """Returns the table with every cell as a single-line, stripped string ('' for empty cells)."""
+    return [[cell.replace('\n', ' ').strip() if cell else '' for cell in row] for row in table]
+
+
+def parse_int_cells(cells):
+    """
+    Converts a Series of raw table cells such as ' 1,234 ' to numbers, with NaN wherever
+    int(cell.replace(',', '')) would fail. Decimals like '12.5' or '1e3' count as invalid
+    instead of being truncated when the column is later cast to int64.
+    """
+    # Imported here so the parse workers, which only need pdfplumber, don't load pandas.
+    import pandas as pd
+
+    cleaned = cells.str.replace(',', '', regex=False).str.strip()
+    is_whole_number = cleaned.str.fullmatch(r"[+-]?\d+", na=False)
+    return pd.to_numeric(cleaned.where(is_whole_number), errors='coerce')
+
+
+def table_contains(table, *phrases):
+    """
+    Returns True if every phrase appears in some cell of the table. Stops at the cell that
+    completes the set, without joining the whole table into one string first.
+    """
+    remaining = phrases
+    for row in table:
+        for cell in row:
+            if cell and any(phrase in cell for phrase in remaining):
+                remaining = [phrase for phrase in remaining if phrase not in cell]
+                if not remaining:
+                    return True
+    return False
+
+
+def text_above(preparsed, page_idx, y):
+    """Returns the text of the lines on a page that start above the vertical position y."""
+    return "\n".join(text for top, text in preparsed.pages_lines[page_idx] if top < y)
+
+
+def read_pdf_bytes(pdf_file):
+    """Returns the raw bytes of an uploaded file or any other seekable file-like object."""
+    if isinstance(pdf_file, bytes):
+        return pdf_file
+    if hasattr(pdf_file, "getvalue"):
+        return pdf_file.getvalue()
+    pdf_file.seek(0)
+    return pdf_file.read()
+
+
+def preparse_many(pdf_files):
+    """
+    Pre-parses several PDFs in parallel, one worker process per PDF, keeping the input order.
+
+    pdfplumber parsing is CPU-bound and every PDF is independent, so a batch upload scales
+    with the number of cores. Files are passed to the workers as raw bytes because Streamlit's
+    UploadedFile objects cannot be pickled. If a PDF fails to parse, its raw bytes are returned
+    in its place so the extractor that receives it reports the error as before.
+    """
+    pdf_files = list(pdf_files)
+    results = [None] * len(pdf_files)
+    for idx, result in preparse_as_completed(pdf_files):
+        results[idx] = result
+    return results
+
+
+def preparse_as_completed(pdf_files):
+    """
+    Same as preparse_many, but yields (index, result) pairs as soon as each PDF is ready, so
+    callers can report progress and start on finished PDFs while the others are still parsing.
+    Cached PDFs come first; the rest follow in the order their workers finish.
+    """
+    payloads = [read_pdf_bytes(pdf_file) for pdf_file in pdf_files]
+
+    # Only PDFs that are not already cached need parsing; duplicates in the batch are parsed once.
+    pending = {}  # content key -> indices of the PDFs with those bytes
+    for idx, payload in enumerate(payloads):
+        key = _content_key(payload)
+        preparsed = _cache_get(key)
+        if preparsed is not None:
+            yield idx, preparsed
+        else:
+            pending.setdefault(key, []).append(idx)
+
+    workers = min(os.cpu_count() or 1, len(pending))
+    if workers < 2:
+        for key, indices in pending.items():
+            # A lone PDF still gets its pages parsed in parallel if it is long enough
+            yield from _store_parsed(key, _parse_or_bytes(payloads[indices[0]], _parse_split), indices)
+        return
+
+    done = set()
+    try:
+        # 'spawn' avoids forking the Streamlit server process with its threads and sockets.
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = {
+                executor.submit(_parse_or_bytes, payloads[indices[0]]): key
+                for key, indices in pending.items()
+            }
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    result = future.result()
+                except Exception:
+                    # The worker died (e.g. BrokenProcessPool after it was killed), so parse
+                    # this PDF in-process instead of failing the whole batch.
+                    result = _parse_or_bytes(payloads[pending[key][0]])
+                done.add(key)
+                yield from _store_parsed(key, result, pending[key])
+    except Exception:
+        pass  # the pool could not be started or shut down; parse whatever is left below
+
+    for key, indices in pending.items():
+        if key not in done:
+            yield from _store_parsed(key, _parse_or_bytes(payloads[indices[0]]), indices)
+
+
+def _store_parsed(key, result, indices):
+    if isinstance(result, PreparsedPDF):
+        _cache_put(key, result)
+    for idx in indices:
+        yield idx, result
+
+
+def _parse_or_bytes(pdf_bytes, parse=_parse):
+    try:
+        return parse(pdf_bytes)
+    except Exception:
+        return pdf_bytes
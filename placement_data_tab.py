@@ -1,111 +1,118 @@
 import streamlit as st
-import pdfplumber
 import pandas as pd
-import io
 import re
 
-def extract_college_info(text):
-    """Extracts college name and ID from text."""
-    college_name_match = re.search(r"Institute Name:\s*(.*?)\s*\[", text)
-    college_code_match = re.search(r"\[(IR-[^\]]+)\]", text)
-    college_name = college_name_match.group(1).strip() if college_name_match else "Not Found"
-    college_code = college_code_match.group(1).strip() if college_code_match else "Not Found"
-    return college_name, college_code
+from pdf_utils import ensure_preparsed, parse_int_cells, preparse_many, text_above
+from excel_utils import dataframes_to_excel_bytes
 
-def find_program_name_for_table(page, table_obj, previous_page_text=""):
+_PROGRAM_RE = re.compile(r"(UG|PG) \[(\d+) Years? Program\(s\)\]")
+
+def find_program_name_for_table(preparsed, page_idx, table_bbox, previous_page_text=""):
     """
-    Finds the program name associated with a table, looking on the current page first,
+    Finds the program associated with a table, looking on the current page first,
     then on the previous page's text if the table is at the top of the current page.
+    Returns a (program type, years) tuple such as ('UG', '4'), or None if not found.
     """
-    table_y_position = table_obj.bbox[1]
-    text_above_table = page.crop((0, 0, page.width, table_y_position)).extract_text()
+    table_y_position = table_bbox[1]
+    text_above_table = text_above(preparsed, page_idx, table_y_position)
     
     if text_above_table:
-        matches = re.findall(r"(UG \[\d+ Years? Program\(s\)\]|PG \[\d+ Years? Program\(s\)\])", text_above_table)
+        matches = _PROGRAM_RE.findall(text_above_table)
         if matches:
             return matches[-1]
 
     if table_y_position < 150 and previous_page_text:
-        matches = re.findall(r"(UG \[\d+ Years? Program\(s\)\]|PG \[\d+ Years? Program\(s\)\])", previous_page_text)
+        matches = _PROGRAM_RE.findall(previous_page_text)
         if matches:
             return matches[-1]
     
-    return "Unknown Program"
+    return None
+
+def _placement_columns(header_row):
+    """
+    Returns the (academic year, graduated, placed, higher studies) column indices of a placement
+    table's header row, or None if the header does not belong to a placement table.
+    """
+    # Identify the table by checking for essential column headers
+    required_cols = ["No. of students graduating in minimum stipulated time", "No. of students placed", "No. of students selected for Higher Studies"]
+    if not all(col in header_row for col in required_cols):
+        return None
+
+    try:
+        grad_year_col = header_row.index("Academic Year", 1)
+    except ValueError:
+        return None
+    return (
+        grad_year_col,
+        header_row.index("No. of students graduating in minimum stipulated time"),
+        header_row.index("No. of students placed"),
+        header_row.index("No. of students selected for Higher Studies"),
+    )
 
 def extract_placement_data(pdf_file):
     """
     Extracts placement and higher studies data by finding and parsing specific tables.
     """
-    all_placement_data = []
+    raw_rows = []  # (program, year, graduated, placed, higher studies) as read from the tables
     
     try:
-        with pdfplumber.open(pdf_file) as pdf:
-            first_page_text = pdf.pages[0].extract_text()
-            if not first_page_text: first_page_text = ""
-            college_name, college_code = extract_college_info(first_page_text)
-
-            previous_page_text = ""
-            for page in pdf.pages:
-                table_objects = page.find_tables()
-                if not table_objects:
-                    previous_page_text = page.extract_text() or ""
+        preparsed = ensure_preparsed(pdf_file)
+        college_name, college_code = preparsed.college_name, preparsed.college_code
+
+        header_columns = {}  # header row -> _placement_columns(header row)
+        previous_page_text = ""
+        for page_idx, tables in enumerate(preparsed.pages_tables):
+            if not tables:
+                previous_page_text = preparsed.pages_text[page_idx]
+                continue
+
+            for table_data, table_bbox in zip(tables, preparsed.pages_table_bboxes[page_idx]):
+                if not table_data or len(table_data) < 2: continue
+                
+                header_row = tuple(str(cell).replace('\n', ' ') if cell else '' for cell in table_data[0])
+
+                # Every program's table shares the same header, so its columns are looked up once
+                if header_row not in header_columns:
+                    header_columns[header_row] = _placement_columns(header_row)
+                columns = header_columns[header_row]
+                if columns is None:
                     continue
 
-                for table_obj in table_objects:
-                    table_data = table_obj.extract()
-                    if not table_data or len(table_data) < 2: continue
-                    
-                    header_row = [str(cell).replace('\n', ' ') if cell else '' for cell in table_data[0]]
-
-                    # Identify the table by checking for essential column headers
-                    required_cols = ["No. of students graduating in minimum stipulated time", "No. of students placed", "No. of students selected for Higher Studies"]
-                    if not all(col in header_row for col in required_cols):
-                        continue
-
-                    program_header = find_program_name_for_table(page, table_obj, previous_page_text)
-                    prog_name_match = re.search(r"(UG|PG)-(\d+)", program_header.replace(" ", "").replace("[", "-").replace("YearsProgram(s)]", ""))
-                    if not prog_name_match: continue
-                    prog_type, prog_years = prog_name_match.groups()
-                    prog_name = f"{prog_type}-{prog_years}"
-                    
-                    try:
-                        grad_year_col = header_row.index("Academic Year", 1)
-                        graduated_col = header_row.index("No. of students graduating in minimum stipulated time")
-                        placed_col = header_row.index("No. of students placed")
-                        higher_studies_col = header_row.index("No. of students selected for Higher Studies")
-                    except (ValueError, StopIteration):
-                        continue
-
-                    for row in table_data[1:]:
-                        try:
-                            grad_year = row[grad_year_col]
-                            graduated = int(row[graduated_col].replace(',', ''))
-                            placed = int(row[placed_col].replace(',', ''))
-                            higher_studies = int(row[higher_studies_col].replace(',', ''))
-                            
-                            placement_pct = round((placed / graduated) * 100, 2) if graduated > 0 else 0.0
-                            higher_pct = round((higher_studies / graduated) * 100, 2) if graduated > 0 else 0.0
-
-                            all_placement_data.append({
-                                "CollegeName": college_name,
-                                "CollegeCode": college_code,
-                                "ProgramName": prog_name,
-                                "GraduationYear": grad_year,
-                                "Graduated": graduated,
-                                "Placed": placed,
-                                "Placement %": placement_pct,
-                                "Higher Studies": higher_studies,
-                                "Higher Studies %": higher_pct
-                            })
-                        except (ValueError, IndexError, TypeError):
-                            continue
-                
-                previous_page_text = page.extract_text() or ""
+                program = find_program_name_for_table(preparsed, page_idx, table_bbox, previous_page_text)
+                if not program: continue
+                prog_type, prog_years = program
+                prog_name = f"{prog_type}-{prog_years}"
+                grad_year_col, graduated_col, placed_col, higher_studies_col = columns
+
+                # Keep the raw cells; they are converted to numbers for all tables at once below
+                needed_cols = max(grad_year_col, graduated_col, placed_col, higher_studies_col) + 1
+                for row in table_data[1:]:
+                    if len(row) < needed_cols: continue
+                    raw_rows.append((prog_name, row[grad_year_col], row[graduated_col], row[placed_col], row[higher_studies_col]))
+            
+            previous_page_text = preparsed.pages_text[page_idx]
         
-        if not all_placement_data:
+        if not raw_rows:
             return pd.DataFrame()
 
-        df = pd.DataFrame(all_placement_data)
+        df = pd.DataFrame(raw_rows, columns=["ProgramName", "GraduationYear", "Graduated", "Placed", "Higher Studies"])
+        count_cols = ["Graduated", "Placed", "Higher Studies"]
+        for col in count_cols:
+            df[col] = parse_int_cells(df[col])
+        # Rows with a missing or non-integer count are skipped
+        df = df.dropna(subset=count_cols).reset_index(drop=True)
+        if df.empty:
+            return pd.DataFrame()
+        df[count_cols] = df[count_cols].astype('int64')
+
+        graduated = df["Graduated"].where(df["Graduated"] > 0)
+        df["Placement %"] = (df["Placed"] / graduated * 100).round(2).fillna(0.0)
+        df["Higher Studies %"] = (df["Higher Studies"] / graduated * 100).round(2).fillna(0.0)
+
+        df.insert(0, "CollegeName", college_name)
+        df.insert(1, "CollegeCode", college_code)
+        df = df[["CollegeName", "CollegeCode", "ProgramName", "GraduationYear", "Graduated",
+                 "Placed", "Placement %", "Higher Studies", "Higher Studies %"]]
         df.insert(0, 'SNo', range(1, 1 + len(df)))
         return df
 
@@ -127,8 +134,8 @@ def placement_data_tab():
     if uploaded_files:
         all_dfs = []
         with st.spinner("Extracting placement & higher studies data..."):
-            for uploaded_file in uploaded_files:
-                df = extract_placement_data(uploaded_file)
+            for preparsed in preparse_many(uploaded_files):
+                df = extract_placement_data(preparsed)
                 if not df.empty:
                     all_dfs.append(df)
 
@@ -149,10 +156,7 @@ def placement_data_tab():
 
             st.dataframe(final_df, use_container_width=True)
 
-            output = io.BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                final_df.to_excel(writer, index=False, sheet_name="Placement Data")
-            processed_data = output.getvalue()
+            processed_data = dataframes_to_excel_bytes({"Placement Data": final_df})
 
             st.download_button(
                 label="📥 Download as Excel",
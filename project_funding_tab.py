@@ -1,9 +1,19 @@
 import streamlit as st
-import pdfplumber
 import pandas as pd
-import io
 import re
-from collections import defaultdict
+
+from pdf_utils import ensure_preparsed, parse_int_cells, preparse_many
+from excel_utils import dataframes_to_excel_bytes
+
+_NAME_RE = re.compile(r"Institute Name:\s*(.*?)\s*\[")
+_ID_RE = re.compile(r"\[(IR-[A-Z]-[A-Z]-\d+)\]")
+
+# Row labels of the yearly figures we keep, checked in order, and the kind of figure each holds
+_METRIC_KINDS = (
+    ('Total no. of Sponsored Projects', 'projects'),
+    ('Total no. of Consultancy Projects', 'projects'),
+    ('Total Amount Received (Amount in Rupees)', 'amount'),
+)
 
 def extract_project_funding_data(pdf_file):
     """
@@ -21,90 +31,97 @@ def extract_project_funding_data(pdf_file):
         DataFrame if the tables are not found.
     """
     try:
-        with pdfplumber.open(pdf_file) as pdf:
-            # Extract basic college info from the first page.
-            first_page_text = pdf.pages[0].extract_text()
-            college_name_match = re.search(r"Institute Name:\s*(.*?)\s*\[", first_page_text)
-            college_id_match = re.search(r"\[(IR-[A-Z]-[A-Z]-\d+)\]", first_page_text)
+        preparsed = ensure_preparsed(pdf_file)
+        # Extract basic college info from the first page.
+        first_page_text = preparsed.pages_text[0]
+        college_name_match = _NAME_RE.search(first_page_text)
+        college_id_match = _ID_RE.search(first_page_text)
+        
+        college_name = college_name_match.group(1).strip() if college_name_match else "Unknown"
+        college_id = college_id_match.group(1).strip() if college_id_match else "Unknown"
+
+        # (Year, Metric, Value) for every yearly figure found; Metric is the output column it belongs to
+        funding_entries = []
+
+        # --- Helper function to process the vertical table structure ---
+        def process_vertical_table(table, metric_columns):
+            if not table or len(table) < 2:
+                return
             
-            college_name = college_name_match.group(1).strip() if college_name_match else "Unknown"
-            college_id = college_id_match.group(1).strip() if college_id_match else "Unknown"
+            # The first row contains 'Financial Year' and the years themselves.
+            years = [y.strip() for y in table[0][1:] if y and y.strip()]
+            
+            # Iterate over the other rows to find the data we need.
+            for row in table[1:]:
+                metric_name = row[0].replace('\n', ' ').strip()
+                kind = next((kind for label, kind in _METRIC_KINDS if label in metric_name), None)
+                if kind is None:
+                    continue
+                metric = metric_columns[kind]
+
+                values = [v.strip() for v in row[1:] if v and v.strip()]
+                
+                # Ensure we have a value for each year.
+                if len(values) < len(years): continue
 
-            sponsored_data = defaultdict(dict)
-            consultancy_data = defaultdict(dict)
+                for year, value in zip(years, values):
+                    funding_entries.append({'Year': year, 'Metric': metric, 'Value': value})
 
-            # --- Helper function to process the vertical table structure ---
-            def process_vertical_table(table, data_dict, project_key, amount_key):
-                if not table or len(table) < 2:
-                    return
+        # --- Find and process the tables ---
+        sponsored_found = consultancy_found = False
+        for tables in preparsed.pages_tables:
+            for table in tables:
+                if not table: continue
                 
-                # The first row contains 'Financial Year' and the years themselves.
-                years = [y.strip() for y in table[0][1:] if y and y.strip()]
+                # Identify tables by the unique text in their first column.
+                first_column_text = " ".join(str(row[0]) for row in table if row and row[0])
                 
-                # Iterate over the other rows to find the data we need.
-                for row in table[1:]:
-                    metric_name = row[0].replace('\n', ' ').strip()
-                    values = [v.strip() for v in row[1:] if v and v.strip()]
-                    
-                    # Ensure we have a value for each year.
-                    if len(values) < len(years): continue
-
-                    for i, year in enumerate(years):
-                        try:
-                            value_int = int(values[i].replace(',', ''))
-                            if 'Total no. of Sponsored Projects' in metric_name:
-                                data_dict[year][project_key] = value_int
-                            elif 'Total no. of Consultancy Projects' in metric_name:
-                                data_dict[year][project_key] = value_int
-                            elif 'Total Amount Received (Amount in Rupees)' in metric_name:
-                                data_dict[year][amount_key] = value_int
-                        except (ValueError, IndexError):
-                            continue
-
-            # --- Find and process the tables ---
-            for page in pdf.pages:
-                tables = page.extract_tables()
-                for table in tables:
-                    if not table: continue
-                    
-                    # Identify tables by the unique text in their first column.
-                    first_column_text = " ".join(str(row[0]) for row in table if row and row[0])
-                    
-                    if 'Sponsored Projects' in first_column_text:
-                        process_vertical_table(table, sponsored_data, 'sponsored_projects', 'sponsored_amount')
-                    
-                    if 'Consultancy Projects' in first_column_text:
-                        process_vertical_table(table, consultancy_data, 'consultancy_projects', 'consultancy_amount')
-
-            # --- Combine the extracted data ---
-            combined_data = []
-            all_years = sorted(list(set(sponsored_data.keys()) | set(consultancy_data.keys())), reverse=True)
-            s_no = 1
-            
-            for year in all_years:
-                s_projects = sponsored_data[year].get('sponsored_projects', 0)
-                s_amount = sponsored_data[year].get('sponsored_amount', 0)
-                c_projects = consultancy_data[year].get('consultancy_projects', 0)
-                c_amount = consultancy_data[year].get('consultancy_amount', 0)
-                total_amount = s_amount + c_amount
-
-                combined_data.append({
-                    "S.No": s_no,
-                    "College Name": college_name,
-                    "College ID": college_id,
-                    "Financial Year": year,
-                    "Total no. of Sponsored Projects": s_projects,
-                    "Total Amount Received (Sponsored)": s_amount,
-                    "Total no. of Consultancy Projects": c_projects,
-                    "Total Amount Received (Consultancy)": c_amount,
-                    "Total Sanctioned Amount": total_amount
-                })
-                s_no += 1
-            
-            if not combined_data:
-                return pd.DataFrame()
-
-            return pd.DataFrame(combined_data)
+                if 'Sponsored Projects' in first_column_text:
+                    process_vertical_table(table, {'projects': "Total no. of Sponsored Projects", 'amount': "Total Amount Received (Sponsored)"})
+                    sponsored_found = True
+                
+                if 'Consultancy Projects' in first_column_text:
+                    process_vertical_table(table, {'projects': "Total no. of Consultancy Projects", 'amount': "Total Amount Received (Consultancy)"})
+                    consultancy_found = True
+
+            # Both tables sit near the start of the report; the remaining pages are not needed.
+            if sponsored_found and consultancy_found:
+                break
+
+        # --- Combine the extracted data ---
+        if not funding_entries:
+            return pd.DataFrame()
+
+        raw = pd.DataFrame(funding_entries)
+        raw['Value'] = parse_int_cells(raw['Value'])
+        raw = raw.dropna(subset=['Value'])
+        if raw.empty:
+            return pd.DataFrame()
+
+        # One row per year, one column per metric; a later table overrides an earlier one
+        value_cols = [
+            "Total no. of Sponsored Projects",
+            "Total Amount Received (Sponsored)",
+            "Total no. of Consultancy Projects",
+            "Total Amount Received (Consultancy)",
+        ]
+        combined_df = (
+            raw.pivot_table(index='Year', columns='Metric', values='Value', aggfunc='last')
+            .reindex(columns=value_cols)
+            .fillna(0)
+            .astype('int64')
+            .sort_index(ascending=False)
+        )
+        combined_df["Total Sanctioned Amount"] = (
+            combined_df["Total Amount Received (Sponsored)"] + combined_df["Total Amount Received (Consultancy)"]
+        )
+
+        combined_df = combined_df.reset_index().rename(columns={'Year': "Financial Year"})
+        combined_df.columns.name = None
+        combined_df.insert(0, "S.No", range(1, 1 + len(combined_df)))
+        combined_df.insert(1, "College Name", college_name)
+        combined_df.insert(2, "College ID", college_id)
+        return combined_df
 
     except Exception as e:
         st.error(f"An error occurred while processing the PDF: {e}")
@@ -125,9 +142,8 @@ def project_funding_tab():
     if uploaded_pdfs:
         all_data = []
         with st.spinner("Extracting project funding data from PDF(s)..."):
-            for pdf_file in uploaded_pdfs:
-                pdf_file.seek(0)
-                df = extract_project_funding_data(pdf_file)
+            for preparsed in preparse_many(uploaded_pdfs):
+                df = extract_project_funding_data(preparsed)
                 if not df.empty:
                     all_data.append(df)
 
@@ -136,10 +152,7 @@ def project_funding_tab():
             st.success("✅ Data extracted successfully!")
             st.dataframe(final_df, use_container_width=True)
 
-            towrite = io.BytesIO()
-            with pd.ExcelWriter(towrite, engine='xlsxwriter') as writer:
-                final_df.to_excel(writer, index=False, sheet_name="Project Funding")
-            towrite.seek(0)
+            towrite = dataframes_to_excel_bytes({"Project Funding": final_df})
 
             st.download_button(
                 label="📥 Download as Excel",
@@ -1,14 +1,24 @@
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+import lxml.html
 from urllib.parse import urljoin
 
-def extract_pdf_links_from_url(url: str, timeout: int = 15) -> list:
+# Every <a> whose href ends in .pdf, in any letter case
+_PDF_HREF_XPATH = "//a[substring(translate(@href, 'PDF', 'pdf'), string-length(@href) - 3) = '.pdf']/@href"
+
+# Shared across calls so scraping several NIRF pages reuses open keep-alive connections
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=10))
+
+def extract_pdf_links_from_url(url: str, timeout: int = 15, session: requests.Session = None) -> list:
     """
     Extracts all PDF URLs from a given NIRF webpage.
 
     Args:
         url (str): The webpage URL to scrape PDF links from.
         timeout (int): Timeout for the HTTP request.
+        session (requests.Session): Session to send the request with. Defaults to a
+            module-level session that is reused between calls.
 
     Returns:
         List[str]: A list of full PDF URLs.
@@ -18,17 +28,16 @@ def extract_pdf_links_from_url(url: str, timeout: int = 15) -> list:
         ValueError: If no PDF links are found.
     """
     try:
-        response = requests.get(url, timeout=timeout)
-        response.raise_for_status()
+        # Streamed so lxml parses the page as it arrives instead of after it is fully buffered
+        with (session or _SESSION).get(url, timeout=timeout, stream=True) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            root = lxml.html.parse(response.raw).getroot()
     except requests.exceptions.RequestException as e:
         raise requests.exceptions.RequestException(f"Failed to fetch URL: {e}")
 
-    soup = BeautifulSoup(response.content, "html.parser")
-    pdf_links = [
-        urljoin(url, a["href"])
-        for a in soup.find_all("a", href=True)
-        if a["href"].lower().endswith(".pdf")
-    ]
+    # An empty page has no root element, and so no links
+    pdf_links = [urljoin(url, href) for href in root.xpath(_PDF_HREF_XPATH)] if root is not None else []
 
     if not pdf_links:
         raise ValueError("No PDF links found on the page.")
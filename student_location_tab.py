@@ -1,9 +1,31 @@
 import streamlit as st
-import pdfplumber
 import pandas as pd
-import io
 import re
 
+from pdf_utils import ensure_preparsed, parse_int_cells, preparse_many
+from excel_utils import dataframes_to_excel_bytes
+
+_NAME_RE = re.compile(r"Institute Name:\s*(.*?)\s*\[")
+_ID_RE = re.compile(r"\[(IR-[A-Z]-[A-Z]-\d+)\]")
+
+# Headers of the 'Total Actual Student Strength' table.
+_REQUIRED_HEADERS = (
+    'Total Students',
+    'Outside State (Including male & female)',
+    'Outside Country (Including male & female)'
+)
+
+# Rows of UG/PG programs; other rows hold totals or notes.
+_PROGRAM_PREFIXES = ("UG [", "PG [")
+
+def _location_columns(header):
+    """
+    Returns the indices of the required headers in a header row, or None if any is missing.
+    """
+    if not all(h in header for h in _REQUIRED_HEADERS):
+        return None
+    return tuple(header.index(h) for h in _REQUIRED_HEADERS)
+
 def extract_student_location_data(pdf_file):
     """
     Extracts student location data from a specific table in a NIRF PDF.
@@ -21,100 +43,90 @@ def extract_student_location_data(pdf_file):
         DataFrame if the target table is not found or data cannot be extracted.
     """
     try:
-        with pdfplumber.open(pdf_file) as pdf:
-            # Extract institute name and ID from the first page's text for context.
-            first_page_text = pdf.pages[0].extract_text()
-            college_name_match = re.search(r"Institute Name:\s*(.*?)\s*\[", first_page_text)
-            college_id_match = re.search(r"\[(IR-[A-Z]-[A-Z]-\d+)\]", first_page_text)
+        preparsed = ensure_preparsed(pdf_file)
+        # Extract institute name and ID from the first page's text for context.
+        first_page_text = preparsed.pages_text[0]
+        college_name_match = _NAME_RE.search(first_page_text)
+        college_id_match = _ID_RE.search(first_page_text)
+        
+        college_name = college_name_match.group(1).strip() if college_name_match else "Unknown"
+        college_id = college_id_match.group(1).strip() if college_id_match else "Unknown"
+
+        raw_rows = []  # (program, total, outside state, outside country) as read from the table
+        table_found = False
+        header_columns = {}  # header row -> _location_columns(header row)
+
+        # We'll search for the correct table on the first few pages.
+        for tables in preparsed.pages_tables:
+            if table_found:
+                break
             
-            college_name = college_name_match.group(1).strip() if college_name_match else "Unknown"
-            college_id = college_id_match.group(1).strip() if college_id_match else "Unknown"
-
-            data = []
-            s_no = 1
-            table_found = False
-
-            # We'll search for the correct table on the first few pages.
-            for page in pdf.pages:
-                if table_found:
-                    break
-                
-                tables = page.extract_tables()
-                for table in tables:
-                    if not table:
-                        continue
-
-                    # Clean the header row to handle newlines and make identification reliable.
-                    header = [str(cell).replace('\n', ' ') if cell else '' for cell in table[0]]
-
-                    # Define the headers for the target table.
-                    required_headers = [
-                        'Total Students',
-                        'Outside State (Including male & female)',
-                        'Outside Country (Including male & female)'
-                    ]
-
-                    # Check if all required headers are present in the current table.
-                    if all(h in header for h in required_headers):
-                        table_found = True
+            for table in tables:
+                if not table:
+                    continue
+
+                # Clean the header row to handle newlines and make identification reliable.
+                header = tuple(str(cell).replace('\n', ' ') if cell else '' for cell in table[0])
+
+                # Tables often repeat a header layout, so each one is checked only once.
+                if header not in header_columns:
+                    header_columns[header] = _location_columns(header)
+                columns = header_columns[header]
+
+                if columns is not None:
+                    table_found = True
+                    program_col_idx = 0  # Program name is typically the first column.
+                    total_col_idx, outside_state_col_idx, outside_country_col_idx = columns
+                    needed_cols = max(columns) + 1
+
+                    # Iterate through the rows of the identified table, skipping the header.
+                    for row in table[1:]:
+                        program_name_raw = row[program_col_idx]
                         
-                        try:
-                            # Get the column indices based on header names.
-                            program_col_idx = 0  # Program name is typically the first column.
-                            total_col_idx = header.index('Total Students')
-                            outside_state_col_idx = header.index('Outside State (Including male & female)')
-                            outside_country_col_idx = header.index('Outside Country (Including male & female)')
-                        except ValueError:
-                            # If a required header is missing (should not happen due to check above), skip.
+                        if not program_name_raw:
                             continue
+                        
+                        program_name = program_name_raw.replace('\n', ' ').strip()
+
+                        # Process only the rows that correspond to UG/PG programs.
+                        if program_name.startswith(_PROGRAM_PREFIXES) and len(row) >= needed_cols:
+                            raw_rows.append((program_name, row[total_col_idx], row[outside_state_col_idx], row[outside_country_col_idx]))
+                    if table_found:
+                        break
+
+        if not raw_rows:
+            return pd.DataFrame()
+
+        # Clean and convert the counts for all rows at once; rows with an empty or
+        # non-integer count are skipped.
+        counts = pd.DataFrame(raw_rows, columns=["Program", "Total", "Outside State", "Outside Country"])
+        count_cols = ["Total", "Outside State", "Outside Country"]
+        for col in count_cols:
+            counts[col] = parse_int_cells(counts[col])
+        counts = counts.dropna(subset=count_cols).reset_index(drop=True)
+        if counts.empty:
+            return pd.DataFrame()
+        counts[count_cols] = counts[count_cols].astype('int64')
+
+        # Calculate ratios, handling division by zero.
+        total = counts["Total"].where(counts["Total"] > 0)
+        state_ratio = (counts["Outside State"] / total * 100).round(2).fillna(0.0)
+        country_ratio = (counts["Outside Country"] / total * 100).round(2).fillna(0.0)
+
+        return pd.DataFrame({
+            "S.No": range(1, len(counts) + 1),
+            "College Name": college_name,
+            "College ID": college_id,
+            "Program": counts["Program"],
+            "Total Students": counts["Total"],
+            "Outside State (Count & %)": counts["Outside State"].astype(str) + " (" + state_ratio.map("{:.2f}%".format) + ")",
+            "Outside Country (Count & %)": counts["Outside Country"].astype(str) + " (" + country_ratio.map("{:.2f}%".format) + ")",
+        })
 
-                        # Iterate through the rows of the identified table, skipping the header.
-                        for row in table[1:]:
-                            program_name_raw = row[program_col_idx]
-                            
-                            if not program_name_raw or not program_name_raw.strip():
-                                continue
-                            
-                            program_name = program_name_raw.replace('\n', ' ').strip()
-
-                            # Process only the rows that correspond to UG/PG programs.
-                            if program_name.startswith("UG [") or program_name.startswith("PG ["):
-                                try:
-                                    # Extract and clean the numeric strings.
-                                    total_students_str = row[total_col_idx].replace(',', '').strip()
-                                    outside_state_str = row[outside_state_col_idx].replace(',', '').strip()
-                                    outside_country_str = row[outside_country_col_idx].replace(',', '').strip()
-
-                                    if total_students_str and outside_state_str and outside_country_str:
-                                        total_students = int(total_students_str)
-                                        outside_state = int(outside_state_str)
-                                        outside_country = int(outside_country_str)
-
-                                        # Calculate ratios, handling division by zero.
-                                        state_ratio = round((outside_state / total_students) * 100, 2) if total_students > 0 else 0
-                                        country_ratio = round((outside_country / total_students) * 100, 2) if total_students > 0 else 0
-
-                                        data.append({
-                                            "S.No": s_no,
-                                            "College Name": college_name,
-                                            "College ID": college_id,
-                                            "Program": program_name,
-                                            "Total Students": total_students,
-                                            "Outside State (Count & %)": f"{outside_state} ({state_ratio:.2f}%)",
-                                            "Outside Country (Count & %)": f"{outside_country} ({country_ratio:.2f}%)"
-                                        })
-                                        s_no += 1
-                                except (ValueError, TypeError, IndexError):
-                                    # Catches errors if a cell is empty, not a number, or doesn't exist.
-                                    continue
-                        if table_found:
-                            break
     except Exception as e:
         st.error(f"An error occurred while processing the PDF: {e}")
         return pd.DataFrame()
 
-    return pd.DataFrame(data)
-
 def student_location_tab():
     """
     Streamlit UI function to upload PDFs and display extracted student location data.
@@ -125,9 +137,8 @@ def student_location_tab():
     if uploaded_pdfs:
         all_data = []
         with st.spinner("Extracting location data from PDF(s)..."):
-            for pdf_file in uploaded_pdfs:
-                pdf_file.seek(0)
-                df = extract_student_location_data(pdf_file)
+            for preparsed in preparse_many(uploaded_pdfs):
+                df = extract_student_location_data(preparsed)
                 if not df.empty:
                     all_data.append(df)
 
@@ -136,10 +147,7 @@ def student_location_tab():
             st.success("✅ Location data extracted successfully!")
             st.dataframe(final_df, use_container_width=True)
 
-            towrite = io.BytesIO()
-            with pd.ExcelWriter(towrite, engine='xlsxwriter') as writer:
-                final_df.to_excel(writer, index=False, sheet_name="Student Location")
-            towrite.seek(0)
+            towrite = dataframes_to_excel_bytes({"Student Location": final_df})
 
             st.download_button(
                 label="📥 Download as Excel",
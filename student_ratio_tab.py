@@ -1,9 +1,13 @@
 import streamlit as st
-import pdfplumber
 import pandas as pd
-import io
 import re
 
+from pdf_utils import ensure_preparsed, parse_int_cells, preparse_many
+from excel_utils import dataframes_to_excel_bytes
+
+_NAME_RE = re.compile(r"Institute Name:\s*(.*?)\s*\[")
+_ID_RE = re.compile(r"\[(IR-[A-Z]-[A-Z]-\d+)\]")
+
 def extract_student_ratio_data(pdf_file):
     """
     Extracts student gender ratio data from a specific table in a NIRF PDF.
@@ -20,95 +24,90 @@ def extract_student_ratio_data(pdf_file):
         DataFrame if the target table is not found or data cannot be extracted.
     """
     try:
-        with pdfplumber.open(pdf_file) as pdf:
-            # Extract institute name and ID from the first page's text for context.
-            first_page_text = pdf.pages[0].extract_text()
-            college_name_match = re.search(r"Institute Name:\s*(.*?)\s*\[", first_page_text)
-            college_id_match = re.search(r"\[(IR-[A-Z]-[A-Z]-\d+)\]", first_page_text)
+        preparsed = ensure_preparsed(pdf_file)
+        # Extract institute name and ID from the first page's text for context.
+        first_page_text = preparsed.pages_text[0]
+        college_name_match = _NAME_RE.search(first_page_text)
+        college_id_match = _ID_RE.search(first_page_text)
+        
+        college_name = college_name_match.group(1).strip() if college_name_match else "Unknown"
+        college_id = college_id_match.group(1).strip() if college_id_match else "Unknown"
+
+        raw_rows = []  # (program, total, female) as read from the table
+        table_found = False
+
+        # We'll search for the correct table on the first few pages.
+        for tables in preparsed.pages_tables:
+            if table_found:
+                break
             
-            college_name = college_name_match.group(1).strip() if college_name_match else "Unknown"
-            college_id = college_id_match.group(1).strip() if college_id_match else "Unknown"
-
-            data = []
-            s_no = 1
-            table_found = False
-
-            # We'll search for the correct table on the first few pages.
-            for page in pdf.pages:
-                if table_found:
-                    break
-                
-                # Extract tables from the current page.
-                tables = page.extract_tables()
-                for table in tables:
-                    if not table:
+            for table in tables:
+                if not table:
+                    continue
+
+                # Clean the header row for reliable identification.
+                # Headers can sometimes have newlines.
+                header = [str(cell).replace('\n', ' ') if cell else '' for cell in table[0]]
+
+                # Check for the specific headers of the "Total Actual Student Strength" table.
+                if 'No. of Male Students' in header and 'No. of Female Students' in header and 'Total Students' in header:
+                    table_found = True
+                    
+                    try:
+                        # Get the column indices based on header names.
+                        program_col_idx = 0  # Program name is typically the first column.
+                        female_col_idx = header.index('No. of Female Students')
+                        total_col_idx = header.index('Total Students')
+                        needed_cols = max(female_col_idx, total_col_idx) + 1
+                    except ValueError:
+                        # If a required header is missing, skip this table.
                         continue
 
-                    # Clean the header row for reliable identification.
-                    # Headers can sometimes have newlines.
-                    header = [str(cell).replace('\n', ' ') if cell else '' for cell in table[0]]
-
-                    # Check for the specific headers of the "Total Actual Student Strength" table.
-                    if 'No. of Male Students' in header and 'No. of Female Students' in header and 'Total Students' in header:
-                        table_found = True
+                    # Iterate through the rows of the identified table, skipping the header.
+                    for row in table[1:]:
+                        program_name_raw = row[program_col_idx]
                         
-                        try:
-                            # Get the column indices based on header names.
-                            program_col_idx = 0  # Program name is typically the first column.
-                            female_col_idx = header.index('No. of Female Students')
-                            total_col_idx = header.index('Total Students')
-                        except ValueError:
-                            # If a required header is missing, skip this table.
+                        # Ensure the program name cell is not empty.
+                        if not program_name_raw or not program_name_raw.strip():
                             continue
+                        
+                        # Clean up the program name.
+                        program_name = program_name_raw.replace('\n', ' ').strip()
+
+                        # Process only the rows that correspond to UG/PG programs.
+                        if (program_name.startswith("UG [") or program_name.startswith("PG [")) and len(row) >= needed_cols:
+                            raw_rows.append((program_name, row[total_col_idx], row[female_col_idx]))
+                    # Once the correct table is found and processed, exit the loop.
+                    if table_found:
+                        break
+
+        if not raw_rows:
+            return pd.DataFrame()
+
+        # Clean and convert the counts for all rows at once; rows with an empty or
+        # non-integer count are skipped.
+        counts = pd.DataFrame(raw_rows, columns=["Program", "Total Students", "Female Students"])
+        count_cols = ["Total Students", "Female Students"]
+        for col in count_cols:
+            counts[col] = parse_int_cells(counts[col])
+        counts = counts.dropna(subset=count_cols).reset_index(drop=True)
+        if counts.empty:
+            return pd.DataFrame()
+        counts[count_cols] = counts[count_cols].astype('int64')
+
+        # Calculate the female ratio, handling division by zero.
+        total = counts["Total Students"].where(counts["Total Students"] > 0)
+        counts["Female Ratio (%)"] = (counts["Female Students"] / total * 100).round(2).fillna(0.0)
+
+        counts.insert(0, "S.No", range(1, len(counts) + 1))
+        counts.insert(1, "College Name", college_name)
+        counts.insert(2, "College ID", college_id)
+        return counts
 
-                        # Iterate through the rows of the identified table, skipping the header.
-                        for row in table[1:]:
-                            program_name_raw = row[program_col_idx]
-                            
-                            # Ensure the program name cell is not empty.
-                            if not program_name_raw or not program_name_raw.strip():
-                                continue
-                            
-                            # Clean up the program name.
-                            program_name = program_name_raw.replace('\n', ' ').strip()
-
-                            # Process only the rows that correspond to UG/PG programs.
-                            if program_name.startswith("UG [") or program_name.startswith("PG ["):
-                                try:
-                                    # Extract and clean the numeric strings.
-                                    total_students_str = row[total_col_idx].replace(',', '').strip()
-                                    female_students_str = row[female_col_idx].replace(',', '').strip()
-
-                                    if total_students_str and female_students_str:
-                                        total_students = int(total_students_str)
-                                        female_students = int(female_students_str)
-
-                                        # Calculate the female ratio, handling division by zero.
-                                        ratio = round((female_students / total_students) * 100, 2) if total_students > 0 else 0
-
-                                        data.append({
-                                            "S.No": s_no,
-                                            "College Name": college_name,
-                                            "College ID": college_id,
-                                            "Program": program_name,
-                                            "Total Students": total_students,
-                                            "Female Students": female_students,
-                                            "Female Ratio (%)": ratio
-                                        })
-                                        s_no += 1
-                                except (ValueError, TypeError, IndexError):
-                                    # This will catch errors if a cell is empty, not a number, or doesn't exist.
-                                    # Continue to the next row.
-                                    continue
-                        # Once the correct table is found and processed, exit the loop.
-                        if table_found:
-                            break
     except Exception as e:
         st.error(f"An error occurred while processing the PDF: {e}")
         return pd.DataFrame() # Return an empty dataframe on error
 
-    return pd.DataFrame(data)
-
 def student_ratio_tab():
     """
     Streamlit UI function to upload PDFs and display extracted student ratio data.
@@ -119,10 +118,8 @@ def student_ratio_tab():
     if uploaded_pdfs:
         all_data = []
         with st.spinner("Extracting data from PDF(s)..."):
-            for pdf_file in uploaded_pdfs:
-                # Rewind the file buffer before passing it to the extraction function.
-                pdf_file.seek(0)
-                df = extract_student_ratio_data(pdf_file)
+            for preparsed in preparse_many(uploaded_pdfs):
+                df = extract_student_ratio_data(preparsed)
                 if not df.empty:
                     all_data.append(df)
 
@@ -133,11 +130,7 @@ def student_ratio_tab():
             st.dataframe(final_df, use_container_width=True)
 
             # Prepare the data for Excel download.
-            towrite = io.BytesIO()
-            with pd.ExcelWriter(towrite, engine='xlsxwriter') as writer:
-                final_df.to_excel(writer, index=False, sheet_name="Student Ratio")
-            # Seek to the beginning of the stream.
-            towrite.seek(0)
+            towrite = dataframes_to_excel_bytes({"Student Ratio": final_df})
 
             st.download_button(
                 label="📥 Download as Excel",
@@ -1,9 +1,25 @@
 import streamlit as st
-import pdfplumber
 import pandas as pd
-import io
 import re
 
+from pdf_utils import ensure_preparsed, parse_int_cells, preparse_many
+from excel_utils import dataframes_to_excel_bytes
+
+_NAME_RE = re.compile(r"Institute Name:\s*(.*?)\s*\[")
+_ID_RE = re.compile(r"\[(IR-[A-Z]-[A-Z]-\d+)\]")
+
+# The headers we need to find in the table, in output column order.
+# Note: Some headers are long and might be split across lines.
+_SUPPORT_HEADERS = (
+    'Economically Backward (Including male & female)',
+    'Socially Challenged (SC+ST+OBC Including male & female)',
+    'No. of students receiving full tuition fee reimbursement from the State and Central Government',
+    'No. of students receiving full tuition fee reimbursement from Institution Funds',
+    'No. of students receiving full tuition fee reimbursement from the Private Bodies',
+    'No. of students who are not receiving full tuition fee reimbursement'
+)
+_SUPPORT_HEADER_SET = frozenset(_SUPPORT_HEADERS)
+
 def extract_student_support_data(pdf_file):
     """
     Extracts student financial support and demographic data from a NIRF PDF.
@@ -20,98 +36,85 @@ def extract_student_support_data(pdf_file):
         DataFrame if the target table or columns are not found.
     """
     try:
-        with pdfplumber.open(pdf_file) as pdf:
-            first_page_text = pdf.pages[0].extract_text()
-            college_name_match = re.search(r"Institute Name:\s*(.*?)\s*\[", first_page_text)
-            college_id_match = re.search(r"\[(IR-[A-Z]-[A-Z]-\d+)\]", first_page_text)
+        preparsed = ensure_preparsed(pdf_file)
+        first_page_text = preparsed.pages_text[0]
+        college_name_match = _NAME_RE.search(first_page_text)
+        college_id_match = _ID_RE.search(first_page_text)
+        
+        college_name = college_name_match.group(1).strip() if college_name_match else "Unknown"
+        college_id = college_id_match.group(1).strip() if college_id_match else "Unknown"
+
+        raw_rows = []  # (program, *counts) as read from the table
+        table_found = False
+
+        for tables in preparsed.pages_tables:
+            if table_found:
+                break
             
-            college_name = college_name_match.group(1).strip() if college_name_match else "Unknown"
-            college_id = college_id_match.group(1).strip() if college_id_match else "Unknown"
-
-            data = []
-            s_no = 1
-            table_found = False
-
-            for page in pdf.pages:
-                if table_found:
-                    break
-                
-                tables = page.extract_tables()
-                for table in tables:
-                    if not table:
-                        continue
-
-                    # Clean header row, merging multi-line cells for reliable matching.
-                    header = [str(cell).replace('\n', ' ') if cell else '' for cell in table[0]]
-
-                    # Define the headers we need to find in the table.
-                    # Note: Some headers are long and might be split across lines.
-                    required_headers = [
-                        'Economically Backward (Including male & female)',
-                        'Socially Challenged (SC+ST+OBC Including male & female)',
-                        'No. of students receiving full tuition fee reimbursement from the State and Central Government',
-                        'No. of students receiving full tuition fee reimbursement from Institution Funds',
-                        'No. of students receiving full tuition fee reimbursement from the Private Bodies',
-                        'No. of students who are not receiving full tuition fee reimbursement'
-                    ]
+            for table in tables:
+                if not table:
+                    continue
+
+                # Clean header row, merging multi-line cells for reliable matching.
+                header = [str(cell).replace('\n', ' ') if cell else '' for cell in table[0]]
+
+                # Map each header to its first column so lookups don't rescan the row.
+                col_idx = {}
+                for i, h in enumerate(header):
+                    col_idx.setdefault(h, i)
+
+                # Check if all required headers are present.
+                if col_idx.keys() >= _SUPPORT_HEADER_SET:
+                    table_found = True
                     
-                    # Check if all required headers are present.
-                    if all(h in header for h in required_headers):
-                        table_found = True
-                        
-                        try:
-                            # Get column indices for the required data.
-                            program_col_idx = 0
-                            eb_col_idx = header.index(required_headers[0])
-                            sc_col_idx = header.index(required_headers[1])
-                            gov_fee_col_idx = header.index(required_headers[2])
-                            inst_fee_col_idx = header.index(required_headers[3])
-                            pvt_fee_col_idx = header.index(required_headers[4])
-                            no_fee_col_idx = header.index(required_headers[5])
-                        except ValueError:
+                    # Get column indices for the required data, in the order of _SUPPORT_HEADERS.
+                    program_col_idx = 0
+                    count_col_idxs = tuple(col_idx[h] for h in _SUPPORT_HEADERS)
+                    needed_cols = max(count_col_idxs) + 1
+
+                    # Process rows in the found table.
+                    for row in table[1:]:
+                        program_name_raw = row[program_col_idx]
+                        if not program_name_raw or not program_name_raw.strip():
                             continue
+                        
+                        program_name = program_name_raw.replace('\n', ' ').strip()
+
+                        if (program_name.startswith("UG [") or program_name.startswith("PG [")) and len(row) >= needed_cols:
+                            raw_rows.append((program_name,) + tuple(row[idx] for idx in count_col_idxs))
+                    if table_found:
+                        break
+
+        if not raw_rows:
+            return pd.DataFrame()
+
+        # Clean and convert the counts for all rows at once; a row with any empty or
+        # non-integer count is skipped.
+        count_cols = [
+            "Economically Backward",
+            "Socially Challenged (SC+ST+OBC)",
+            "Reimbursed by Govt.",
+            "Reimbursed by Institution",
+            "Reimbursed by Private Bodies",
+            "Not Reimbursed"
+        ]
+        df = pd.DataFrame(raw_rows, columns=["Program"] + count_cols)
+        for col in count_cols:
+            df[col] = parse_int_cells(df[col])
+        df = df.dropna(subset=count_cols).reset_index(drop=True)
+        if df.empty:
+            return pd.DataFrame()
+        df[count_cols] = df[count_cols].astype('int64')
+
+        df.insert(0, "S.No", range(1, len(df) + 1))
+        df.insert(1, "College Name", college_name)
+        df.insert(2, "College ID", college_id)
+        return df
 
-                        # Process rows in the found table.
-                        for row in table[1:]:
-                            program_name_raw = row[program_col_idx]
-                            if not program_name_raw or not program_name_raw.strip():
-                                continue
-                            
-                            program_name = program_name_raw.replace('\n', ' ').strip()
-
-                            if program_name.startswith("UG [") or program_name.startswith("PG ["):
-                                try:
-                                    # Extract data, clean it, and convert to integer.
-                                    eb_count = int(row[eb_col_idx].replace(',', '').strip())
-                                    sc_count = int(row[sc_col_idx].replace(',', '').strip())
-                                    gov_fee = int(row[gov_fee_col_idx].replace(',', '').strip())
-                                    inst_fee = int(row[inst_fee_col_idx].replace(',', '').strip())
-                                    pvt_fee = int(row[pvt_fee_col_idx].replace(',', '').strip())
-                                    no_fee = int(row[no_fee_col_idx].replace(',', '').strip())
-
-                                    data.append({
-                                        "S.No": s_no,
-                                        "College Name": college_name,
-                                        "College ID": college_id,
-                                        "Program": program_name,
-                                        "Economically Backward": eb_count,
-                                        "Socially Challenged (SC+ST+OBC)": sc_count,
-                                        "Reimbursed by Govt.": gov_fee,
-                                        "Reimbursed by Institution": inst_fee,
-                                        "Reimbursed by Private Bodies": pvt_fee,
-                                        "Not Reimbursed": no_fee
-                                    })
-                                    s_no += 1
-                                except (ValueError, TypeError, IndexError):
-                                    continue
-                        if table_found:
-                            break
     except Exception as e:
         st.error(f"An error occurred while processing the PDF: {e}")
         return pd.DataFrame()
 
-    return pd.DataFrame(data)
-
 def student_support_tab():
     """
     Streamlit UI function to upload PDFs and display extracted student support data.
@@ -127,9 +130,8 @@ def student_support_tab():
     if uploaded_pdfs:
         all_data = []
         with st.spinner("Extracting support and fee data from PDF(s)..."):
-            for pdf_file in uploaded_pdfs:
-                pdf_file.seek(0)
-                df = extract_student_support_data(pdf_file)
+            for preparsed in preparse_many(uploaded_pdfs):
+                df = extract_student_support_data(preparsed)
                 if not df.empty:
                     all_data.append(df)
 
@@ -138,10 +140,7 @@ def student_support_tab():
             st.success("✅ Data extracted successfully!")
             st.dataframe(final_df, use_container_width=True)
 
-            towrite = io.BytesIO()
-            with pd.ExcelWriter(towrite, engine='xlsxwriter') as writer:
-                final_df.to_excel(writer, index=False, sheet_name="Student Support")
-            towrite.seek(0)
+            towrite = dataframes_to_excel_bytes({"Student Support": final_df})
 
             st.download_button(
                 label="📥 Download as Excel",
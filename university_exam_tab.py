@@ -1,41 +1,44 @@
 import streamlit as st
-import pdfplumber
 import pandas as pd
-import io
 import re
 
-def extract_college_info(text):
-    """Extracts college name and ID from text."""
-    college_name_match = re.search(r"Institute Name:\s*(.*?)\s*\[", text)
-    college_code_match = re.search(r"\[(IR-[^\]]+)\]", text)
-    college_name = college_name_match.group(1).strip() if college_name_match else "Not Found"
-    college_code = college_code_match.group(1).strip() if college_code_match else "Not Found"
-    return college_name, college_code
+from pdf_utils import ensure_preparsed, parse_int_cells, preparse_many, text_above
+from excel_utils import dataframes_to_excel_bytes
 
-def find_program_name_for_table(page, table_obj, previous_page_text=""):
+_PROGRAM_RE = re.compile(r"(UG \[\d+ Years? Program\(s\)\]|PG \[\d+ Years? Program\(s\)\])")
+_PROG_NAME_RE = re.compile(r"(UG|PG) \[(\d+)")
+
+def _last_program_header(text):
+    """Returns the last program header in text, or None, without building a list of all matches."""
+    match = None
+    for match in _PROGRAM_RE.finditer(text):
+        pass
+    return match.group(1) if match else None
+
+def find_program_name_for_table(preparsed, page_idx, table_bbox, previous_page_text=""):
     """
     Finds the program name associated with a table, looking on the current page first,
     then on the previous page's text if the table is at the top of the current page.
     """
-    table_y_position = table_obj.bbox[1]
+    table_y_position = table_bbox[1]
     
-    # Crop the page to only include text above the table
-    text_above_table = page.crop((0, 0, page.width, table_y_position)).extract_text()
+    # Only look at the text above the table
+    text_above_table = text_above(preparsed, page_idx, table_y_position)
     
     # First, search for a header in the text immediately above the table on the same page.
     if text_above_table:
-        matches = re.findall(r"(UG \[\d+ Years? Program\(s\)\]|PG \[\d+ Years? Program\(s\)\])", text_above_table)
-        if matches:
-            # The last match is the one closest to the table.
-            return matches[-1]
+        # The last match is the one closest to the table.
+        header = _last_program_header(text_above_table)
+        if header:
+            return header
 
     # If no header is found above and the table is near the top of the page (e.g., y < 150),
     # it's likely that the header is at the bottom of the previous page.
     if table_y_position < 150 and previous_page_text:
-        matches = re.findall(r"(UG \[\d+ Years? Program\(s\)\]|PG \[\d+ Years? Program\(s\)\])", previous_page_text)
-        if matches:
-            # The last header from the previous page is the most likely candidate.
-            return matches[-1]
+        # The last header from the previous page is the most likely candidate.
+        header = _last_program_header(previous_page_text)
+        if header:
+            return header
     
     return "Unknown Program"
 
@@ -45,85 +48,88 @@ def extract_university_exam_data(pdf_file):
     Extracts university examination data by finding and parsing specific tables
     related to placement and higher studies for each program.
     """
-    all_exam_data = []
+    raw_rows = []  # (program, admit year, grad year, admitted, graduated, lateral) as read from the tables
     
     try:
-        with pdfplumber.open(pdf_file) as pdf:
-            first_page_text = pdf.pages[0].extract_text()
-            if not first_page_text: first_page_text = ""
-            college_name, college_code = extract_college_info(first_page_text)
-
-            previous_page_text = ""
-            for page in pdf.pages:
-                # Use find_tables() to get Table objects with bbox properties
-                table_objects = page.find_tables()
-                if not table_objects:
-                    previous_page_text = page.extract_text() or ""
-                    continue
+        preparsed = ensure_preparsed(pdf_file)
+        college_name, college_code = preparsed.college_name, preparsed.college_code
 
-                for table_obj in table_objects:
-                    # .extract() gets the table data as a list of lists
-                    table_data = table_obj.extract()
-                    if not table_data or len(table_data) < 2: continue
-                    
-                    header_row = [str(cell).replace('\n', ' ') if cell else '' for cell in table_data[0]]
-
-                    # Identify the table by checking for essential column headers
-                    required_cols = ["No. of first year students admitted in the year", "No. of students graduating in minimum stipulated time"]
-                    if not all(col in header_row for col in required_cols):
-                        continue
-
-                    # If it's the right kind of table, find its program name
-                    program_header = find_program_name_for_table(page, table_obj, previous_page_text)
-                    prog_name_match = re.search(r"(UG|PG) \[(\d+)", program_header)
-                    if not prog_name_match: continue
-                    prog_type, prog_years = prog_name_match.groups()
-                    prog_name = f"{prog_type}-{prog_years}"
-
-                    # Find the indices of the columns we need
-                    try:
-                        admit_year_col = header_row.index("Academic Year")
-                        admitted_col = header_row.index("No. of first year students admitted in the year")
-                        grad_year_col = header_row.index("Academic Year", admit_year_col + 1)
-                        graduated_col = header_row.index("No. of students graduating in minimum stipulated time")
-                        lateral_entry_col = header_row.index("No. of students admitted through Lateral entry") if "No. of students admitted through Lateral entry" in header_row else -1
-                    except ValueError:
-                        continue
-
-                    for row in table_data[1:]:
-                        try:
-                            admit_year = row[admit_year_col]
-                            grad_year = row[grad_year_col]
-                            
-                            admitted = int(row[admitted_col].replace(',', ''))
-                            graduated = int(row[graduated_col].replace(',', ''))
-                            
-                            lateral_admitted = 0
-                            if lateral_entry_col != -1 and row[lateral_entry_col] and row[lateral_entry_col].strip().isdigit():
-                                lateral_admitted = int(row[lateral_entry_col].replace(',', ''))
-                            
-                            total_admitted = admitted + lateral_admitted
-                            percentage = round((graduated / total_admitted) * 100, 2) if total_admitted > 0 else 0.0
-
-                            all_exam_data.append({
-                                "CollegeName": college_name,
-                                "CollegeCode": college_code,
-                                "ProgramName": prog_name,
-                                "AdmitYear": admit_year,
-                                "GraduationYear": grad_year,
-                                "TotalAdmitted": total_admitted,
-                                "Graduated": graduated,
-                                "Percentage": percentage
-                            })
-                        except (ValueError, IndexError, TypeError):
-                            continue
+        previous_page_text = ""
+        for page_idx, tables in enumerate(preparsed.pages_tables):
+            if not tables:
+                previous_page_text = preparsed.pages_text[page_idx]
+                continue
+
+            for table_data, table_bbox in zip(tables, preparsed.pages_table_bboxes[page_idx]):
+                if not table_data or len(table_data) < 2: continue
                 
-                previous_page_text = page.extract_text() or ""
+                header_row = [str(cell).replace('\n', ' ') if cell else '' for cell in table_data[0]]
+
+                # Map each header to its first column so lookups don't rescan the row.
+                col_idx = {}
+                for i, col in enumerate(header_row):
+                    col_idx.setdefault(col, i)
+
+                # Identify the table by checking for essential column headers
+                required_cols = {"No. of first year students admitted in the year", "No. of students graduating in minimum stipulated time"}
+                if not col_idx.keys() >= required_cols:
+                    continue
+
+                # If it's the right kind of table, find its program name
+                program_header = find_program_name_for_table(preparsed, page_idx, table_bbox, previous_page_text)
+                prog_name_match = _PROG_NAME_RE.search(program_header)
+                if not prog_name_match: continue
+                prog_type, prog_years = prog_name_match.groups()
+                prog_name = f"{prog_type}-{prog_years}"
+
+                # Find the indices of the columns we need
+                # "Academic Year" appears twice: the admission year, then the graduation year
+                year_cols = [i for i, col in enumerate(header_row) if col == "Academic Year"]
+                if len(year_cols) < 2:
+                    continue
+                admit_year_col, grad_year_col = year_cols[:2]
+                admitted_col = col_idx["No. of first year students admitted in the year"]
+                graduated_col = col_idx["No. of students graduating in minimum stipulated time"]
+                lateral_entry_col = col_idx.get("No. of students admitted through Lateral entry", -1)
+
+                # Keep the raw cells; they are converted to numbers for all tables at once below
+                needed_cols = max(admit_year_col, admitted_col, grad_year_col, graduated_col, lateral_entry_col) + 1
+                for row in table_data[1:]:
+                    if len(row) < needed_cols: continue
+                    lateral_cell = row[lateral_entry_col] if lateral_entry_col != -1 else None
+                    raw_rows.append((prog_name, row[admit_year_col], row[grad_year_col], row[admitted_col], row[graduated_col], lateral_cell))
+            
+            previous_page_text = preparsed.pages_text[page_idx]
         
-        if not all_exam_data:
+        if not raw_rows:
+            return pd.DataFrame()
+
+        raw = pd.DataFrame(raw_rows, columns=["ProgramName", "AdmitYear", "GraduationYear", "Admitted", "Graduated", "Lateral"])
+        for col in ["Admitted", "Graduated"]:
+            raw[col] = parse_int_cells(raw[col])
+        # Rows with a missing or non-integer admitted/graduated count are skipped
+        raw = raw.dropna(subset=["Admitted", "Graduated"]).reset_index(drop=True)
+        if raw.empty:
             return pd.DataFrame()
 
-        df = pd.DataFrame(all_exam_data)
+        # Lateral entries only count when the cell holds a plain number
+        lateral_is_number = raw["Lateral"].str.strip().str.isdigit().fillna(False).astype(bool)
+        lateral_admitted = pd.to_numeric(raw["Lateral"].where(lateral_is_number), errors='coerce').fillna(0)
+
+        total_admitted = (raw["Admitted"] + lateral_admitted).astype('int64')
+        graduated = raw["Graduated"].astype('int64')
+        percentage = (graduated / total_admitted.where(total_admitted > 0) * 100).round(2).fillna(0.0)
+
+        df = pd.DataFrame({
+            "CollegeName": college_name,
+            "CollegeCode": college_code,
+            "ProgramName": raw["ProgramName"],
+            "AdmitYear": raw["AdmitYear"],
+            "GraduationYear": raw["GraduationYear"],
+            "TotalAdmitted": total_admitted,
+            "Graduated": graduated,
+            "Percentage": percentage
+        })
         df.insert(0, 'SNo', range(1, 1 + len(df)))
         return df
 
@@ -145,8 +151,8 @@ def university_exam_tab():
     if uploaded_files:
         all_dfs = []
         with st.spinner("Extracting university examination data..."):
-            for uploaded_file in uploaded_files:
-                df = extract_university_exam_data(uploaded_file)
+            for preparsed in preparse_many(uploaded_files):
+                df = extract_university_exam_data(preparsed)
                 if not df.empty:
                     all_dfs.append(df)
 
@@ -155,10 +161,7 @@ def university_exam_tab():
             combined_df = pd.concat(all_dfs, ignore_index=True)
             st.dataframe(combined_df, use_container_width=True)
 
-            output = io.BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                combined_df.to_excel(writer, index=False, sheet_name="Exam Data")
-            processed_data = output.getvalue()
+            processed_data = dataframes_to_excel_bytes({"Exam Data": combined_df})
 
             st.download_button(
                 label="📥 Download University Exam Data as Excel",
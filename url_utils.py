@@ -1,7 +1,22 @@
 import streamlit as st
-import requests
-from bs4 import BeautifulSoup
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
 from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor
+
+_DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Listing pages are a few hundred KB at most; anything past this is not read.
+_MAX_PAGE_BYTES = 5 * 1024 * 1024
+
+# Downloaded PDFs are kept on disk keyed by the SHA-256 of their URL, so resubmitting the same
+# page does not download every PDF again.
+_PDF_CACHE_DIR = Path(".nirf_pdf_cache")
+_PDF_CACHE_MAX_AGE = 24 * 60 * 60  # seconds before a cached copy is revalidated with the server
 
 def extract_pdf_links_from_url(url):
     """
@@ -14,36 +29,219 @@ def extract_pdf_links_from_url(url):
         list: A list of absolute URLs pointing to PDF files found on the page.
               Returns an empty list if the URL is invalid or no PDFs are found.
     """
+    # Imported on first use to keep them off the app's startup path.
+    import requests
+
     if not url or not url.startswith(('http://', 'https://')):
         st.error("Invalid URL. Please enter a full URL starting with http:// or https://")
         return []
 
     try:
-        # Using a common user-agent can help avoid being blocked.
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
-
-        soup = BeautifulSoup(response.text, 'html.parser')
-        pdf_links = []
-
-        # Find all anchor tags that have an 'href' attribute.
-        for a_tag in soup.find_all('a', href=True):
-            href = a_tag['href']
-            # Check if the link ends with .pdf (case-insensitive).
-            if href.lower().endswith('.pdf'):
-                # Convert relative URLs (like '/docs/report.pdf') to absolute URLs.
-                absolute_link = urljoin(url, href)
-                pdf_links.append(absolute_link)
-        
-        # Return a list of unique links to avoid processing the same PDF twice.
-        return list(set(pdf_links))
-
+        pdf_links, truncated = _fetch_pdf_links(url)
     except requests.exceptions.RequestException as e:
         st.error(f"Error fetching URL: {e}")
         return []
     except Exception as e:
         st.error(f"An error occurred while parsing the webpage: {e}")
         return []
+
+    if truncated:
+        st.warning("The page is unusually large; only PDF links in its first 5 MB are used.")
+    return pdf_links
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _fetch_pdf_links(url):
+    """
+    Downloads and parses the page, returning (pdf_links, truncated). Cached for an hour so
+    reruns and resubmissions of the same URL skip the request; failures raise and are not cached.
+    All messages are shown by the caller, since cached calls don't run this body again.
+    """
+    import requests
+    from bs4 import BeautifulSoup
+
+    # Using a common user-agent can help avoid being blocked.
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+    }
+    # Streamed and capped so an oversized or endless response can't exhaust memory.
+    page = bytearray()
+    truncated = False
+    with requests.get(url, headers=headers, timeout=10, stream=True) as response:
+        response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
+        for chunk in response.iter_content(_DOWNLOAD_CHUNK_SIZE):
+            page += chunk
+            if len(page) > _MAX_PAGE_BYTES:
+                truncated = True
+                break
+
+    # lxml's C parser is several times faster than html.parser on long listing pages.
+    soup = BeautifulSoup(bytes(page), 'lxml')
+    # Links are collected as dict keys, which drops duplicates as they are found (so the
+    # same PDF is not processed twice) while keeping the order of the page.
+    pdf_links = {}
+
+    # Find all anchor tags whose 'href' ends with .pdf (case-insensitive).
+    for a_tag in soup.select('a[href$=".pdf" i]'):
+        # Convert relative URLs (like '/docs/report.pdf') to absolute URLs.
+        absolute_link = urljoin(url, a_tag['href'])
+        pdf_links[absolute_link] = None
+
+    return list(pdf_links), truncated
+
+
+def download_pdfs(links, timeout=15, max_workers=8, raise_for_status=False, return_exceptions=False):
+    """
+    Downloads several PDF links concurrently and yields their contents in the order of links.
+
+    All downloads share one pooled requests.Session, so links on the same host reuse their
+    TCP/TLS connections instead of handshaking for every file. If a download fails, the
+    exception is raised when its turn comes and the downloads still queued are cancelled,
+    unless return_exceptions is set.
+
+    Args:
+        links (list): URLs of the PDF files to download.
+        timeout (int): Timeout in seconds for each request.
+        max_workers (int): Number of downloads to run at the same time.
+        raise_for_status (bool): Treat HTTP error responses (4xx or 5xx) as failed downloads.
+        return_exceptions (bool): Yield the RequestException of a failed download in place of
+            its content and carry on with the other links.
+
+    Yields:
+        bytes: The content of each downloaded file.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    def fetch(link):
+        try:
+            return _get_streamed(session, link, timeout, raise_for_status)
+        except requests.exceptions.RequestException as e:
+            if return_exceptions:
+                return e
+            raise
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        yield from executor.map(fetch, links)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        session.close()
+
+
+def download_pdf(url, timeout=15):
+    """
+    Downloads a single PDF and returns its content.
+
+    Raises:
+        requests.exceptions.RequestException: If the request fails or returns an error status.
+    """
+    import requests
+
+    return _get_streamed(requests, url, timeout, raise_for_status=True)
+
+
+def _get_streamed(session, url, timeout, raise_for_status=False):
+    """
+    Returns the body of url, using the on-disk download cache when it holds a copy.
+
+    A copy younger than _PDF_CACHE_MAX_AGE is returned without touching the network. An older
+    one is revalidated with a conditional GET (If-None-Match / If-Modified-Since), so an
+    unchanged PDF costs a single 304 round-trip instead of a full download.
+    """
+    body_path, meta_path = _cache_paths(url)
+    meta = _read_cache_meta(meta_path) if body_path.exists() else None
+    if meta and time.time() - meta.get('fetched_at', 0) < _PDF_CACHE_MAX_AGE:
+        cached = _read_cached_body(body_path)
+        if cached is not None:
+            return cached
+        meta = None  # unreadable copy: fall back to a normal download
+
+    headers = {}
+    if meta and meta.get('etag'):
+        headers['If-None-Match'] = meta['etag']
+    if meta and meta.get('last_modified'):
+        headers['If-Modified-Since'] = meta['last_modified']
+
+    with session.get(url, stream=True, timeout=timeout, headers=headers) as response:
+        if not (meta and response.status_code == 304):
+            return _store_response(response, body_path, meta_path, raise_for_status)
+        cached = _read_cached_body(body_path)
+        if cached is not None:
+            _write_cache(body_path, meta_path, None, {**meta, 'fetched_at': time.time()})
+            return cached
+
+    # The server confirmed the cached copy, but it can no longer be read; download it in full.
+    with session.get(url, stream=True, timeout=timeout) as response:
+        return _store_response(response, body_path, meta_path, raise_for_status)
+
+
+def _store_response(response, body_path, meta_path, raise_for_status):
+    """Reads a full response body and caches it if the download succeeded."""
+    if raise_for_status:
+        response.raise_for_status()
+    content = _read_body(response)
+    if response.status_code == 200:
+        _write_cache(body_path, meta_path, content, {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'fetched_at': time.time(),
+        })
+    return content
+
+
+def _read_cached_body(body_path):
+    """Returns the cached body, or None if it was removed or can't be read; the cache is best-effort."""
+    try:
+        return body_path.read_bytes()
+    except OSError:
+        return None
+
+
+def _read_body(response):
+    """
+    Streams the response body in chunks into a buffer sized from Content-Length up front,
+    instead of letting it grow by repeated reallocation.
+    """
+    # Content-Length is the size on the wire, so it is only a hint for compressed bodies;
+    # the buffer still grows or shrinks to fit what is actually received.
+    buffer = bytearray(int(response.headers.get('Content-Length') or 0))
+    size = 0
+    for chunk in response.iter_content(chunk_size=_DOWNLOAD_CHUNK_SIZE):
+        buffer[size:size + len(chunk)] = chunk
+        size += len(chunk)
+    del buffer[size:]
+    return bytes(buffer)
+
+
+def _cache_paths(url):
+    key = hashlib.sha256(url.encode()).hexdigest()
+    return _PDF_CACHE_DIR / f"{key}.pdf", _PDF_CACHE_DIR / f"{key}.json"
+
+
+def _read_cache_meta(meta_path):
+    try:
+        return json.loads(meta_path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cache(body_path, meta_path, content, meta):
+    """Stores a download in the cache; the cache is best-effort, so write failures are ignored."""
+    try:
+        _PDF_CACHE_DIR.mkdir(exist_ok=True)
+        # Write to temporary files and rename, so a concurrent reader never sees a partial file
+        if content is not None:
+            tmp_body = body_path.with_suffix(f".{threading.get_ident()}.tmp")
+            tmp_body.write_bytes(content)
+            os.replace(tmp_body, body_path)
+        tmp_meta = meta_path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp_meta.write_text(json.dumps(meta))
+        os.replace(tmp_meta, meta_path)
+    except OSError:
+        pass